@@ -1,12 +1,16 @@
-import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 import version
-from core.atlassian import manager
+from core import tracing
+from core.atlassian import clients, jobs, manager
+from core.atlassian.api import metrics as metrics_api
 from core.atlassian.api.router import router as bitbucket_router
+from core.atlassian.api.sync import router as sync_router
+from core.atlassian.api.webhooks import router as webhooks_router
+from core.db import base
 
 print("Starting service...")
 
@@ -16,6 +20,7 @@ def init_application():
     async def lifespan(app: FastAPI):
         print("Starting the synchronization of repositories...")
         sync_manager = manager.RepoSyncManager()
+        app.state.sync_manager = sync_manager
         await sync_manager.start_all()
         print("Syncing started")
 
@@ -24,10 +29,11 @@ def init_application():
         finally:
             print("Stopping syncing...")
 
-            for t in list(sync_manager.tasks.values()):
-                t.cancel()
-
-            await asyncio.sleep(0.2)
+            await sync_manager.shutdown()
+            jobs.job_manager.shutdown()
+            await clients.registry.aclose()
+            await base.async_engine.dispose()
+            tracing.tracer.close()
             print("All tasks are stopped")
 
     fastapi_app = FastAPI(
@@ -47,7 +53,12 @@ def init_application():
         allow_headers=["*"],
     )
 
+    fastapi_app.middleware("http")(metrics_api.track_latency)
+
     fastapi_app.include_router(bitbucket_router)
+    fastapi_app.include_router(sync_router)
+    fastapi_app.include_router(webhooks_router)
+    fastapi_app.include_router(metrics_api.router)
     return fastapi_app
 
 
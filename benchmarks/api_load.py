@@ -0,0 +1,270 @@
+"""
+Load test of the REST API against the fake Bitbucket Server.
+
+Starts benchmarks.fake_bitbucket in a subprocess (or uses the server given with --bitbucket) and drives the FastAPI
+app with a fixed number of concurrent clients, in-process through httpx.ASGITransport or over HTTP with --target.
+Reports the throughput and the p50/p95/p99 latency per endpoint. With --max-p95 it fails if an endpoint is slower,
+so it can guard against regressions without a real Bitbucket.
+
+The commits of the local source, relevance and the job status read the database of the app. The pull and relevance
+jobs go to clones that do not exist, so they measure the queueing of a job and fail in the worker right away. A full
+job queue answers 429 and counts as an error. The clone endpoint is not loaded: the fake server serves no git.
+
+    python -m benchmarks.api_load --concurrency 32 --duration 30 --latency 0.02 --repositories 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.stats import percentile
+from core.settings import setting
+
+Request = Tuple[str, str, dict]
+
+
+def endpoints(args: argparse.Namespace, bitbucket: str, job_id: str) -> Dict[str, Callable[[str], Request]]:
+    """
+    The request of every endpoint for a repository of the fake server.
+    """
+    def target(repository: str) -> dict:
+        return {"url": bitbucket, "workspace": "BENCH", "repository": repository, "branch": "main"}
+
+    return {
+        "commits": lambda repository: (
+            "GET",
+            "/bitbucket/repository/commits",
+            {**target(repository), "limit": args.limit},
+        ),
+        "commits_local": lambda repository: (
+            "GET",
+            "/bitbucket/repository/commits",
+            {**target(repository), "limit": args.limit, "source": "local"},
+        ),
+        "commits_stream": lambda repository: (
+            "GET",
+            "/bitbucket/repository/commits/stream",
+            {**target(repository), "page_size": args.page_size, "max_commits": args.stream_commits},
+        ),
+        "pull": lambda repository: ("PUT", "/bitbucket/repository/pull", {"name": f"bench-{repository}"}),
+        "relevance": lambda repository: ("GET", "/bitbucket/repository/relevance", {"name": f"bench-{repository}"}),
+        "job": lambda repository: ("GET", f"/bitbucket/repository/jobs/{job_id}", {}),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_bitbucket(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.fake_bitbucket",
+        f"--port={port}",
+        f"--commits={args.commits}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--error-rate={args.error_rate}",
+    ]
+    return subprocess.Popen(command), f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                response = await client.get(f"{url}/rest/api/1.0/application-properties")
+
+                if response.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The fake Bitbucket at {url} did not start in {timeout:.0f} seconds.")
+
+            await asyncio.sleep(0.1)
+
+
+async def create_job(client: httpx.AsyncClient) -> str:
+    """
+    Queues the job whose status the job endpoint polls.
+    """
+    response = await client.put("/bitbucket/repository/pull", params={"name": "bench-status"})
+    response.raise_for_status()
+    return response.json()["data"]["job"]["id"]
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    requests: Dict[str, Callable[[str], Request]],
+    repositories: List[str],
+    measure_from: float,
+    deadline: float,
+    results: Dict[str, List[Tuple[float, Optional[int]]]],
+):
+    """
+    Sends requests one after another until the deadline, the responses are read to the end.
+    """
+    names = list(requests)
+
+    while time.monotonic() < deadline:
+        name = random.choice(names)
+        method, path, params = requests[name](random.choice(repositories))
+        started = time.monotonic()
+
+        try:
+            async with client.stream(method, path, params=params) as response:
+                async for _ in response.aiter_raw():
+                    pass
+
+                status = response.status_code
+        except httpx.HTTPError:
+            status = None
+
+        if started >= measure_from:
+            results[name].append((time.monotonic() - started, status))
+
+
+def summary(results: Dict[str, List[Tuple[float, Optional[int]]]], elapsed: float) -> Dict[str, dict]:
+    report = {}
+
+    for name, samples in sorted(results.items()):
+        latencies = [latency for latency, _ in samples]
+        errors = sum(1 for _, status in samples if status is None or status >= 400)
+
+        report[name] = {
+            "requests": len(samples),
+            "errors": errors,
+            "throughput": round(len(samples) / elapsed, 2),
+            **{
+                f"{label}_ms": round(value * 1000, 2) if value is not None else None
+                for label, value in (
+                    ("p50", percentile(latencies, 0.50)),
+                    ("p95", percentile(latencies, 0.95)),
+                    ("p99", percentile(latencies, 0.99)),
+                    ("max", max(latencies, default=None)),
+                )
+            },
+        }
+
+    return report
+
+
+async def run(args: argparse.Namespace, bitbucket: str) -> Dict[str, dict]:
+    await wait_until_ready(bitbucket)
+
+    headers = {"Authorization": "Bearer benchmark"}
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.target:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.target, headers=headers, timeout=timeout, limits=limits)
+    else:
+        from app import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://app", headers=headers, timeout=timeout)
+
+    results: Dict[str, List[Tuple[float, Optional[int]]]] = defaultdict(list)
+
+    try:
+        requests = endpoints(args, bitbucket, await create_job(client))
+
+        if args.endpoints:
+            requests = {name: request for name, request in requests.items() if name in args.endpoints}
+
+        repositories = [f"repository-{number}" for number in range(args.repositories)]
+        measure_from = time.monotonic() + args.warmup
+        deadline = measure_from + args.duration
+
+        await asyncio.gather(
+            *(
+                client_loop(client, requests, repositories, measure_from, deadline, results)
+                for _ in range(args.concurrency)
+            )
+        )
+    finally:
+        await client.aclose()
+
+        if not args.target:
+            from core.atlassian import clients
+
+            await clients.registry.aclose()
+
+    return summary(results, args.duration)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", help="base URL of a running instance, the app is loaded in-process by default")
+    parser.add_argument("--bitbucket", help="base URL of a running fake Bitbucket, one is started by default")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured window in seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before the measurement starts")
+    parser.add_argument("--endpoints", nargs="*", help="endpoints to load, all by default")
+    parser.add_argument("--repositories", type=int, default=20, help="distinct repositories the requests go to")
+    parser.add_argument("--limit", type=int, default=25, help="limit of the commits requests")
+    parser.add_argument("--page-size", type=int, default=100, help="page size of the streamed history")
+    parser.add_argument("--stream-commits", type=int, default=500, help="commits read by a stream request")
+    parser.add_argument("--commits", type=int, default=1000, help="commits of every branch of the fake Bitbucket")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected Bitbucket latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra Bitbucket latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of failing Bitbucket requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout of a request in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request sequence")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--max-p95", type=float, help="fail if the p95 latency of an endpoint exceeds this (ms)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server, bitbucket = (None, args.bitbucket) if args.bitbucket else start_bitbucket(args)
+
+    try:
+        report = asyncio.run(run(args, bitbucket))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{'endpoint':16} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for name, row in report.items():
+        p50, p95, p99 = (f"{row[key]:.2f}" if row[key] is not None else "-" for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{name:16} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>9} {p50:>9} {p95:>9} {p99:>9}")
+
+    if args.output:
+        settings = {"http_cache": setting.HTTP_CACHE, "http_max_connections": setting.HTTP_MAX_CONNECTIONS}
+        document = {"concurrency": args.concurrency, "duration": args.duration, **settings, "endpoints": report}
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+
+    slow = [
+        name
+        for name, row in report.items()
+        if args.max_p95 is not None and row["p95_ms"] is not None and row["p95_ms"] > args.max_p95
+    ]
+
+    if slow:
+        print(f"FAIL p95 above {args.max_p95} ms: {', '.join(slow)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+A local stand-in for the parts of the Bitbucket Server REST API that the service calls.
+
+Serves application-properties and the paged commits of any project, repository and branch.
+The histories are generated deterministically, so every run sees the same commits. With --commit-rate the branches
+grow while the server runs. Latency and failures can be injected to see how the service behaves under them.
+
+    python -m benchmarks.fake_bitbucket --port 7990 --latency 0.05 --jitter 0.02 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+
+# Bitbucket Server does not return more than this many items per page, whatever the limit.
+MAX_PAGE_SIZE = 1000
+EPOCH_MS = 1_700_000_000_000
+AUTHOR = {"name": "benchmark", "emailAddress": "benchmark@localhost", "displayName": "Benchmark"}
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    async def apply(self) -> Optional[JSONResponse]:
+        """
+        Delays the request and returns the error response to send instead, if the request was picked to fail.
+        """
+        delay = self.latency + random.uniform(0.0, self.jitter)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and random.random() < self.error_rate:
+            errors = [{"context": None, "message": "Injected failure.", "exceptionName": None}]
+            return JSONResponse(content={"errors": errors}, status_code=self.error_status)
+
+        return None
+
+
+def commit_id(project: str, repository: str, branch: str, number: int) -> str:
+    return hashlib.sha1(f"{project}/{repository}/{branch}/{number}".encode()).hexdigest()
+
+
+def commit(project: str, repository: str, branch: str, number: int) -> dict:
+    """
+    The commit with the given number, counted from the first one of the branch.
+    """
+    hexsha = commit_id(project, repository, branch, number)
+    timestamp = EPOCH_MS + number * 60_000
+    parents = []
+
+    if number:
+        parent = commit_id(project, repository, branch, number - 1)
+        parents.append({"id": parent, "displayId": parent[:11]})
+
+    return {
+        "id": hexsha,
+        "displayId": hexsha[:11],
+        "author": AUTHOR,
+        "authorTimestamp": timestamp,
+        "committer": AUTHOR,
+        "committerTimestamp": timestamp,
+        "message": f"Commit {number} of {branch}",
+        "parents": parents,
+    }
+
+
+def create_app(faults: Faults, commits: int = 500, commit_rate: float = 0.0, version: str = "8.19.0") -> FastAPI:
+    """
+    Every branch starts with the given number of commits and gains commit_rate commits per second.
+    The faults are kept in app.state.faults and may be changed while the server runs.
+    """
+    app = FastAPI(title="Fake Bitbucket Server")
+    app.state.faults = faults
+    started = time.monotonic()
+
+    @app.get("/rest/api/1.0/application-properties")
+    async def application_properties():
+        failure = await app.state.faults.apply()
+
+        if failure is not None:
+            return failure
+
+        return {"version": version, "buildNumber": "8019000", "buildDate": str(EPOCH_MS), "displayName": "Bitbucket"}
+
+    @app.get("/rest/api/1.0/projects/{project}/repos/{repository}/commits")
+    async def get_commits(
+        request: Request,
+        project: str,
+        repository: str,
+        until: str = "refs/heads/main",
+        limit: int = Query(25, ge=1),
+        start: int = Query(0, ge=0),
+    ):
+        failure = await app.state.faults.apply()
+
+        if failure is not None:
+            return failure
+
+        branch = until.removeprefix("refs/heads/")
+        total = commits + int((time.monotonic() - started) * commit_rate)
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        # The newest commit comes first, start skips that many of them.
+        newest = total - 1 - start
+        values = [commit(project, repository, branch, number) for number in range(newest, max(newest - limit, -1), -1)]
+        last = start + len(values) >= total
+        page = {
+            "values": values,
+            "size": len(values),
+            "isLastPage": last,
+            "start": start,
+            "limit": limit,
+            "nextPageStart": None if last else start + len(values),
+        }
+
+        body = json.dumps(page).encode()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7990)
+    parser.add_argument("--commits", type=int, default=500, help="commits of every branch at the start")
+    parser.add_argument("--commit-rate", type=float, default=0.0, help="new commits per second on every branch")
+    parser.add_argument("--latency", type=float, default=0.0, help="added delay of every request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail, 0 to 1")
+    parser.add_argument("--error-status", type=int, default=500, help="status code of the failed requests")
+    args = parser.parse_args()
+
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.error_status)
+    app = create_app(faults, commits=args.commits, commit_rate=args.commit_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Query plan regression check for the hot database paths.
+
+Creates the schema in a scratch schema of the configured Postgres, seeds it with repositories,
+runs EXPLAIN for the lookups of the DAL and fails if one of them scans the whole repositories table.
+Everything happens in one transaction that is rolled back, the database is left untouched.
+
+    python -m benchmarks.query_plans --rows 100000
+"""
+import argparse
+import json
+import sys
+import uuid
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from core.db.base import Base, engine
+from core.db.models import Repository, RepoStatus
+from core.db.repositories import _due
+
+SCHEMA = "query_plan_check"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+SEED = """
+INSERT INTO repositories (name, status, provider, api_url, clone_url, branch, active, auto_sync,
+                          enable_polling, next_sync_at, lease_owner, lease_expires_at)
+SELECT 'repository-' || g,
+       CASE WHEN g % 10 = 0 THEN 'inactive' ELSE 'active' END::repo_status,
+       'Bitbucket Server',
+       'https://bitbucket.example.com',
+       'https://bitbucket.example.com/scm/project/repository-' || g || '.git',
+       'main',
+       g % 10 <> 0,
+       true,
+       g % 20 <> 0,
+       now() + (g % 3600) * interval '1 second',
+       CASE WHEN g % 50 = 0 THEN 'node-1' END,
+       CASE WHEN g % 50 = 0 THEN now() + interval '1 minute' END
+FROM generate_series(1, :rows) AS g
+"""
+
+
+def queries(rows: int) -> List[Tuple[str, object]]:
+    name = f"repository-{rows // 2 + 1}"
+
+    return [
+        (
+            "get_by_name",
+            select(Repository).where(Repository.name == name, Repository.status == RepoStatus.active),
+        ),
+        (
+            "get_by_id",
+            select(Repository).where(Repository.id == uuid.uuid4()),
+        ),
+        (
+            "get_for_pulling",
+            _due(16),
+        ),
+    ]
+
+
+def nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+
+    for child in plan.get("Plans", []):
+        yield from nodes(child)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="number of seeded repositories")
+    parser.add_argument("--verbose", action="store_true", help="print the full plans")
+    args = parser.parse_args()
+
+    failed = False
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+
+        try:
+            connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            connection.execute(text(f"SET LOCAL search_path TO {SCHEMA}, public"))
+            Base.metadata.create_all(connection)
+            connection.execute(text(SEED), {"rows": args.rows})
+            connection.execute(text("ANALYZE repositories"))
+
+            for label, statement in queries(args.rows):
+                plan = connection.execute(Explain(statement)).scalar()
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                scans = [
+                    node
+                    for node in nodes(plan)
+                    if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "repositories"
+                ]
+                indexes = sorted({node["Index Name"] for node in nodes(plan) if "Index Name" in node})
+
+                status = "FAIL" if scans else "ok"
+                failed = failed or bool(scans)
+                print(f"{status:4} {label:16} cost={plan['Total Cost']:<10} indexes={', '.join(indexes) or '-'}")
+
+                if args.verbose or scans:
+                    print(json.dumps(plan, indent=2))
+        finally:
+            transaction.rollback()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
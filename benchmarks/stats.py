@@ -0,0 +1,12 @@
+from typing import List, Optional
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    The nearest-rank percentile (q between 0 and 1), None for no values.
+    """
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
@@ -0,0 +1,346 @@
+"""
+Throughput and detection latency of the sync engine against local bare repositories.
+
+Creates bare repositories with file:// remotes in a scratch directory, clones and registers them in the configured
+Postgres (the schema must be migrated), pushes commits to random repositories at the given rate and runs
+RepoSyncManager for a fixed window. Reports syncs per second, the latency from push to pull, CPU time,
+open file descriptors and RSS. Works offline; the repositories and their rows are removed afterwards.
+
+    python -m benchmarks.sync_engine --repositories 200 --commit-rate 5 --duration 60
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, List, Tuple
+
+from git import Actor, Repo
+from sqlalchemy import delete, select, update
+
+from benchmarks.stats import percentile
+from core.atlassian.manager import RepoSyncManager
+from core.atlassian.object_store import object_store
+from core.atlassian.service import RepositoryGitClient
+from core.db.models import CloneStrategy, Repository, SyncRun, SyncStatus
+from core.db.unit_of_work import UnitOfWork
+from core.settings import setting
+
+AUTHOR = Actor("Benchmark", "benchmark@localhost")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class Pushes:
+    """
+    Commits pushed to the remotes and not pulled by the sync engine yet.
+    The push time is taken right before git push, so the latency includes the push itself.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.latencies: List[float] = []
+        self._pending: Dict[str, Deque[Tuple[float, str]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def pushed(self, name: str, hexsha: str) -> None:
+        with self._lock:
+            self._pending[name].append((time.monotonic(), hexsha))
+            self.count += 1
+
+    def pulled(self, name: str, hexsha: str) -> None:
+        """
+        A pull of the head detects every commit pushed up to it.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            pending = self._pending[name]
+
+            if all(pushed != hexsha for _, pushed in pending):
+                return
+
+            while pending:
+                pushed_at, pushed = pending.popleft()
+                self.latencies.append(now - pushed_at)
+
+                if pushed == hexsha:
+                    break
+
+    @property
+    def undetected(self) -> int:
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+
+class BenchmarkManager(RepoSyncManager):
+    """
+    Counts the finished synchronizations and reports the pulled heads.
+    """
+
+    def __init__(self, pushes: Pushes, workers: int):
+        super().__init__(workers)
+        self.pushes = pushes
+        self.runs: Counter = Counter()
+
+    def _record_run(self, entry, started_at, duration):
+        super()._record_run(entry, started_at, duration)
+        status = entry.run.get("status")
+        self.runs[status.value if status else "unknown"] += 1
+
+    def _pull(self, client, entry):
+        super()._pull(client, entry)
+
+        if entry.run.get("status") == SyncStatus.success:
+            self.pushes.pulled(entry.repository_name, client.repository.head.commit.hexsha)
+
+
+class ResourceSampler:
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.rss: List[int] = []
+        self.fds: List[int] = []
+
+    async def run(self):
+        while True:
+            with open("/proc/self/statm") as statm:
+                self.rss.append(int(statm.read().split()[1]) * PAGE_SIZE)
+
+            self.fds.append(len(os.listdir("/proc/self/fd")))
+            await asyncio.sleep(self.interval)
+
+
+def cpu_seconds() -> Tuple[float, float]:
+    """
+    CPU time (user and system) of this process and of the finished git subprocesses.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def commit(work: Repo, number: int) -> str:
+    path = Path(work.working_tree_dir) / "counter.txt"
+    path.write_text(f"{number}\n")
+    work.index.add([str(path)])
+    return work.index.commit(f"Benchmark commit {number}", author=AUTHOR, committer=AUTHOR).hexsha
+
+
+def create_remote(root: Path, name: str, history: int) -> Repo:
+    """
+    A bare repository with the given number of commits on main and a working copy to push from.
+    """
+    bare = root / "remotes" / f"{name}.git"
+    Repo.init(bare, bare=True, initial_branch="main").close()
+
+    work = Repo.init(root / "work" / name, initial_branch="main")
+    work.create_remote("origin", bare.as_uri())
+
+    for number in range(max(history, 1)):
+        commit(work, number)
+
+    work.git.push("origin", "main")
+    return work
+
+
+def register(name: str, work: Repo, strategy: CloneStrategy) -> None:
+    url = work.remotes.origin.url
+    RepositoryGitClient(folder=name).clone(url=url, branch="main", strategy=strategy)
+
+
+def set_interval(names: List[str], interval: float) -> None:
+    with UnitOfWork().start() as session:
+        session.execute(
+            update(Repository).where(Repository.name.in_(names)).values(sync_interval=int(interval * 1000))
+        )
+
+
+def cleanup(names: List[str], root: Path) -> None:
+    with UnitOfWork().start() as session:
+        repository_ids = select(Repository.id).where(Repository.name.in_(names))
+        session.execute(delete(SyncRun).where(SyncRun.repository_id.in_(repository_ids)))
+        session.execute(delete(Repository).where(Repository.name.in_(names)))
+
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def push_commit(name: str, work: Repo, number: int, pushes: Pushes) -> None:
+    hexsha = commit(work, number)
+    pushes.pushed(name, hexsha)
+    work.git.push("origin", "main")
+
+
+async def push_loop(works: Dict[str, Repo], pushes: Pushes, rate: float):
+    """
+    Pushes commits to random repositories, the arrivals follow a Poisson process with the given rate.
+    Pushes are sequential, so the achieved rate is lower if a push takes longer than the gap.
+    """
+    names = list(works)
+    numbers = itertools.count(1_000_000)
+    next_at = time.monotonic()
+
+    while True:
+        next_at += random.expovariate(rate)
+        await asyncio.sleep(max(next_at - time.monotonic(), 0.0))
+
+        name = random.choice(names)
+        await asyncio.to_thread(push_commit, name, works[name], next(numbers), pushes)
+
+
+async def run(args: argparse.Namespace, works: Dict[str, Repo]) -> dict:
+    pushes = Pushes()
+    manager = BenchmarkManager(pushes, args.workers)
+    sampler = ResourceSampler()
+
+    for name in works:
+        await manager.start(name)
+
+    # The first synchronization of every repository happens at once, it is not part of the measurement.
+    await asyncio.sleep(args.warmup)
+    manager.runs.clear()
+
+    tasks = [asyncio.create_task(sampler.run())]
+
+    if args.commit_rate > 0:
+        tasks.append(asyncio.create_task(push_loop(works, pushes, args.commit_rate)))
+
+    started, (own_cpu, git_cpu) = time.monotonic(), cpu_seconds()
+
+    try:
+        await asyncio.sleep(args.duration)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = time.monotonic() - started
+    own_cpu, git_cpu = (after - before for after, before in zip(cpu_seconds(), (own_cpu, git_cpu)))
+    runs = dict(manager.runs)
+
+    await manager.shutdown()
+
+    latencies = pushes.latencies
+    syncs = sum(runs.values())
+
+    return {
+        "repositories": len(works),
+        "workers": args.workers,
+        "interval": args.interval,
+        "commit_rate": args.commit_rate,
+        "strategy": args.strategy,
+        "adaptive": setting.SYNC_ADAPTIVE,
+        "shared_objects": setting.GIT_SHARED_OBJECTS,
+        "duration": round(elapsed, 3),
+        "syncs": syncs,
+        "syncs_per_second": round(syncs / elapsed, 3),
+        "runs": runs,
+        "pushes": pushes.count,
+        "detected": len(latencies),
+        "undetected": pushes.undetected,
+        "detection_latency": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies, default=None),
+            "mean": statistics.fmean(latencies) if latencies else None,
+        },
+        "cpu": {
+            "process_seconds": round(own_cpu, 3),
+            "git_seconds": round(git_cpu, 3),
+            "utilization": round((own_cpu + git_cpu) / elapsed, 3),
+        },
+        "fds": {"max": max(sampler.fds, default=None), "mean": statistics.fmean(sampler.fds) if sampler.fds else None},
+        "rss_mb": {
+            "max": round(max(sampler.rss) / 2**20, 1) if sampler.rss else None,
+            "mean": round(statistics.fmean(sampler.rss) / 2**20, 1) if sampler.rss else None,
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repositories", type=int, default=50, help="number of bare repositories")
+    parser.add_argument("--commit-rate", type=float, default=2.0, help="pushed commits per second, all repositories")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured window in seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before the measurement starts")
+    parser.add_argument("--interval", type=float, default=5.0, help="polling interval in seconds, at least 1")
+    parser.add_argument("--workers", type=int, default=setting.SYNC_WORKERS, help="sync workers")
+    parser.add_argument("--history", type=int, default=10, help="commits in every repository before the run")
+    parser.add_argument(
+        "--strategy",
+        default=CloneStrategy.shallow.value,
+        choices=[strategy.value for strategy in CloneStrategy],
+        help="clone strategy of the working clones",
+    )
+    parser.add_argument("--setup-workers", type=int, default=8, help="threads creating and cloning repositories")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the push sequence")
+    parser.add_argument("--workdir", help="scratch directory, a temporary one by default")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="keep the repositories and their rows")
+    parser.add_argument("--verbose", action="store_true", help="show the log of the sync engine")
+    args = parser.parse_args()
+
+    if args.interval < 1:
+        parser.error("--interval must be at least 1 second, shorter sync intervals are read as seconds")
+
+    random.seed(args.seed)
+    root = Path(args.workdir or tempfile.mkdtemp(prefix="sync-benchmark-"))
+    run_id = uuid.uuid4().hex[:8]
+    names = [f"bench-{run_id}-{number:05d}" for number in range(args.repositories)]
+
+    # The working clones and the shared object caches go to the scratch directory as well.
+    setting.REPOSITORIES_STORAGE = str(root / "storage")
+
+    if object_store is not None:
+        object_store.root = root / "objects"
+
+    works: Dict[str, Repo] = {}
+
+    try:
+        with contextlib.ExitStack() as log:
+            if not args.verbose:
+                log.enter_context(contextlib.redirect_stdout(log.enter_context(open(os.devnull, "w"))))
+
+            print(f"Creating and registering {len(names)} repositories in {root}...", file=sys.stderr)
+
+            with ThreadPoolExecutor(max_workers=args.setup_workers) as executor:
+                works = dict(zip(names, executor.map(lambda name: create_remote(root, name, args.history), names)))
+                list(executor.map(lambda name: register(name, works[name], CloneStrategy(args.strategy)), names))
+
+            set_interval(names, args.interval)
+
+            print(f"Running for {args.warmup + args.duration:.0f} seconds...", file=sys.stderr)
+            report = asyncio.run(run(args, works))
+    finally:
+        for work in works.values():
+            work.close()
+
+        if args.keep:
+            print(f"The repositories are kept in {root}, their names start with bench-{run_id}.", file=sys.stderr)
+        else:
+            cleanup(names, root)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import time
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from core import metrics
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get(
+    "/metrics",
+    summary="Metrics of the sync engine and the API in the Prometheus text format",
+    response_class=PlainTextResponse,
+)
+async def scrape() -> PlainTextResponse:
+    return PlainTextResponse(generate_latest(metrics.registry), media_type=CONTENT_TYPE_LATEST)
+
+
+async def track_latency(request: Request, call_next):
+    """
+    HTTP middleware recording the latency by route template, unmatched paths share one label to bound the cardinality.
+    """
+    started = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.http_seconds.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        ).observe(time.perf_counter() - started)
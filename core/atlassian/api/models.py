@@ -1,8 +1,10 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, HttpUrl
 
+from core.db.models import CloneStrategy
+
 
 class BitbucketServerBase(BaseModel):
     url: HttpUrl = Field(..., description="Atlassian host with the bitbucket server that is being accessed")
@@ -16,9 +18,34 @@ class BitbucketRepository(BitbucketWorkspace):
     repository: str = Field(..., min_length=1, description="Repository name")
 
 
+class CommitSource(str, Enum):
+    REMOTE = "remote"
+    LOCAL = "local"
+
+
 class RequestBitbucketServerCommits(BitbucketRepository):
     branch: str = Field(..., min_length=1, description="Repository branch")
-    limit: int = Field(default=1, ge=1, le=25, description="How many results to return per page")
+    limit: int = Field(
+        default=1,
+        ge=1,
+        le=1000,
+        description="How many results to return per page, at most 25 for the remote source",
+    )
+    source: CommitSource = Field(
+        default=CommitSource.REMOTE,
+        description="Ask Bitbucket directly or read the commit index of the synchronized clones",
+    )
+    cursor: Optional[str] = Field(None, description="nextCursor of the previous page of the local source")
+
+
+class RequestBitbucketServerCommitsStream(BitbucketRepository):
+    branch: str = Field(..., min_length=1, description="Repository branch")
+    page_size: int = Field(default=100, ge=1, le=1000, description="How many commits to request from Bitbucket at once")
+    max_commits: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Stop after this many commits, the whole history by default",
+    )
 
 
 class RepositoryRequest(BaseModel):
@@ -28,6 +55,43 @@ class RepositoryRequest(BaseModel):
 class RepositoryCloneRequest(RepositoryRequest):
     url: str = Field(..., min_length=1, description="The link for cloning the repository")
     branch: str = Field(default="main", min_length=1, description="The branch that needs to be cloned or updated")
+    strategy: CloneStrategy = Field(
+        default=CloneStrategy.shallow,
+        description="shallow (last commit only), full, blobless or treeless partial clone, or sparse checkout",
+    )
+    sparse_paths: Optional[str] = Field(
+        None,
+        description="Comma-separated directories to check out, required for the sparse strategy",
+    )
+
+    tracked_refs: Optional[str] = Field(
+        None,
+        description="Comma-separated patterns of further branches to track, e.g. develop,release/*",
+    )
+
+    @property
+    def sparse_path_list(self) -> List[str]:
+        return [path.strip() for path in (self.sparse_paths or "").split(",") if path.strip()]
+
+    @property
+    def tracked_ref_list(self) -> List[str]:
+        return [ref.strip() for ref in (self.tracked_refs or "").split(",") if ref.strip()]
+
+
+class StreamFormat(str, Enum):
+    SSE = "sse"
+    NDJSON = "ndjson"
+
+
+class RepositoryCloneStreamRequest(RepositoryCloneRequest):
+    stream: Optional[StreamFormat] = Field(
+        None,
+        description="Stream the clone progress as Server-Sent Events or NDJSON instead of returning the job at once",
+    )
+
+
+class JobEventsRequest(BaseModel):
+    format: StreamFormat = Field(default=StreamFormat.SSE, description="Format of the progress stream")
 
 
 class RepositoryPullRequest(RepositoryRequest):
@@ -42,6 +106,11 @@ class RepositoryRelevanceRequest(RepositoryRequest):
     pass
 
 
+class SyncRunSummaryRequest(BaseModel):
+    hours: float = Field(default=24.0, gt=0, le=24 * 366, description="The time window to aggregate, in hours")
+    limit: int = Field(default=20, ge=1, le=500, description="How many repositories to return, the slowest first")
+
+
 class ResponseStatus(str, Enum):
     SUCCESS = "success"
     ERROR = "error"
@@ -1,14 +1,29 @@
-from typing import Union
+import asyncio
+import base64
+import fnmatch
+import hashlib
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+import httpx
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from core import tracing
 from core.atlassian.api import models
 from core.atlassian.auth import auth, strategies
+from core.atlassian.jobs import Job, JobQueueFull, job_manager
 from core.atlassian.service import BitbucketRepositoryClient, RepositoryGitClient
+from core.db.models import Commit
+from core.db.repositories import AsyncCommitReadWrite, AsyncRepositoryReadWrite
+from core.db.unit_of_work import AsyncUnitOfWork
+from core.settings import setting
 
 router = APIRouter(prefix="/bitbucket/repository", tags=["Bitbucket"])
 
+REMOTE_COMMITS_LIMIT = 25
+
 
 @router.get(
     "/commits",
@@ -19,7 +34,8 @@ router = APIRouter(prefix="/bitbucket/repository", tags=["Bitbucket"])
 async def get_commits(
     request: models.RequestBitbucketServerCommits = Depends(),
     credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.bitbucket),
-) -> Union[models.BitbucketServerResponse, JSONResponse]:
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+) -> Union[models.BitbucketServerResponse, JSONResponse, Response]:
     if isinstance(credentials, JSONResponse):
         return credentials
 
@@ -31,6 +47,14 @@ async def get_commits(
         branch=request.branch,
     )
 
+    if request.source == models.CommitSource.LOCAL:
+        return await _access_denied(repository) or await _local_commits(request, if_none_match)
+
+    if request.limit > REMOTE_COMMITS_LIMIT:
+        message = f"At most {REMOTE_COMMITS_LIMIT} commits can be requested from Bitbucket at once."
+        content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
+        return JSONResponse(content=content, status_code=400)
+
     try:
         response = await repository.fetch_commits(limit=request.limit)
         data = response.json()
@@ -57,29 +81,249 @@ async def get_commits(
     return JSONResponse(content=content, status_code=status_code)
 
 
+@router.get(
+    "/commits/stream",
+    summary="Stream the whole commit history of a branch as NDJSON",
+    response_model=None,
+)
+async def stream_commits(
+    request: models.RequestBitbucketServerCommitsStream = Depends(),
+    credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.bitbucket),
+) -> Union[StreamingResponse, JSONResponse]:
+    if isinstance(credentials, JSONResponse):
+        return credentials
+
+    repository = BitbucketRepositoryClient(
+        base_url=request.url,
+        credentials=credentials,
+        workspace=request.workspace,
+        repository=request.repository,
+        branch=request.branch,
+    )
+    commits = repository.iter_commits(page_size=request.page_size, max_commits=request.max_commits)
+
+    # The first page is awaited here, so a rejected request still gets a proper status code.
+    try:
+        first = await anext(commits, None)
+    except httpx.HTTPStatusError as e:
+        try:
+            message = repository.extract_error(e.response.json())
+        except ValueError:
+            message = str(e)
+
+        content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
+        return JSONResponse(content=content, status_code=e.response.status_code)
+    except Exception as e:
+        message = f"Internal error while fetching commits: {e}"
+        content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
+        return JSONResponse(content=content, status_code=500)
+
+    async def lines() -> AsyncIterator[str]:
+        if first is None:
+            return
+
+        yield json.dumps(first) + "\n"
+
+        try:
+            async for commit in commits:
+                yield json.dumps(commit) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"The history was interrupted: {e}"}) + "\n"
+        finally:
+            await commits.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _encode_cursor(commit: Commit) -> str:
+    key = json.dumps([commit.committed_at.isoformat(), commit.hash])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return datetime.fromisoformat(key[0]), str(key[1])
+
+
+def _commit_data(commit: Commit) -> dict:
+    """
+    The shape of a commit in the Bitbucket Server REST API, limited to the indexed fields.
+    """
+    return {
+        "id": commit.hash,
+        "displayId": commit.hash[:11],
+        "message": commit.message,
+        "author": {"name": commit.author_name, "emailAddress": commit.author_email},
+        "authorTimestamp": int(commit.authored_at.timestamp() * 1000) if commit.authored_at else None,
+        "committerTimestamp": int(commit.committed_at.timestamp() * 1000),
+    }
+
+
+async def _access_denied(repository: BitbucketRepositoryClient) -> Optional[JSONResponse]:
+    """
+    The local index holds the history of private repositories, so the caller must be able to read the branch
+    on Bitbucket. The check asks for the latest commit with the caller's credentials; the response cache keeps
+    the answer per credentials and revalidates it conditionally, so polling does not reach Bitbucket every time.
+    Returns the error response for a denied request, None if the access is granted.
+    """
+    try:
+        response = await repository.fetch_latest_commit()
+
+        if response.status_code == 200:
+            return None
+
+        if 400 <= response.status_code <= 499:
+            try:
+                message = repository.extract_error(response.json())
+            except ValueError:
+                message = response.reason_phrase
+
+            content = models.BitbucketServerResponse(status="error", message=message)
+            return JSONResponse(content=content.model_dump(exclude_none=True), status_code=response.status_code)
+
+        raise Exception("Unexpected response from the Bitbucket server.")
+    except Exception as e:
+        message = f"Internal error while checking the access to the repository: {e}"
+        content = models.BitbucketServerResponse(status="error", message=message)
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=500)
+
+
+async def _local_commits(
+    request: models.RequestBitbucketServerCommits,
+    if_none_match: Optional[str],
+) -> Union[JSONResponse, Response]:
+    """
+    Serves a page of commits from the local index with keyset pagination, for the clones of the requested host.
+    The ETag covers the page, so polling dashboards get a 304 until new commits are indexed.
+    """
+    try:
+        after = _decode_cursor(request.cursor) if request.cursor else None
+    except (ValueError, TypeError, IndexError):
+        content = models.BitbucketServerResponse(status="error", message="Invalid cursor.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=400)
+
+    try:
+        async with AsyncUnitOfWork().start() as session:
+            db = AsyncRepositoryReadWrite(session)
+            db_repository = next(
+                (
+                    r
+                    for r in await db.get_by_remote(request.url.host, request.workspace, request.repository)
+                    if any(fnmatch.fnmatchcase(request.branch, p) for p in [r.branch, *(r.tracked_refs or [])])
+                ),
+                None,
+            )
+
+            if db_repository is None:
+                message = "The branch of the repository is not synchronized, use the remote source."
+                content = models.BitbucketServerResponse(status="error", message=message)
+                return JSONResponse(content=content.model_dump(exclude_none=True), status_code=404)
+
+            commits = await AsyncCommitReadWrite(session).get_page(
+                str(db_repository.id), request.branch, request.limit + 1, after
+            )
+    except Exception as e:
+        message = f"Internal error while reading the commit index: {e}"
+        content = models.BitbucketServerResponse(status="error", message=message)
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=500)
+
+    page = commits[: request.limit]
+    last_page = len(commits) <= request.limit
+    fingerprint = "|".join([str(db_repository.id), request.branch, request.cursor or "", *(c.hash for c in page)])
+    etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    data = {
+        "values": [_commit_data(commit) for commit in page],
+        "size": len(page),
+        "limit": request.limit,
+        "isLastPage": last_page,
+        "nextCursor": None if last_page else _encode_cursor(page[-1]),
+    }
+    content = models.BitbucketServerResponse(
+        status="success",
+        message="The list of commits was successfully received from the local index.",
+        data=data,
+    )
+    return JSONResponse(content=content.model_dump(exclude_none=True), headers=headers)
+
+
+def _job_accepted(job: Job, message: str) -> JSONResponse:
+    content = models.BitbucketServerResponse(status="success", message=message, data={"job": job.to_dict()})
+    return JSONResponse(content=content.model_dump(exclude_none=True), status_code=202)
+
+
+def _job_rejected(error: Exception) -> JSONResponse:
+    content = models.BitbucketServerResponse(status="error", message=str(error))
+    return JSONResponse(content=content.model_dump(exclude_none=True), status_code=429)
+
+
+async def _job_events(job: Job, stream_format: models.StreamFormat) -> AsyncIterator[str]:
+    """
+    Emits the state of the job whenever it changes, polling no more often than the stream interval.
+    The stream ends with the final state of the job.
+    """
+    version = -1
+
+    while True:
+        finished = job.finished
+
+        if job.version != version:
+            version = job.version
+            data = json.dumps(job.to_dict())
+
+            if stream_format == models.StreamFormat.SSE:
+                yield f"event: {job.status.value}\nid: {version}\ndata: {data}\n\n"
+            else:
+                yield f"{data}\n"
+
+        if finished:
+            return
+
+        await asyncio.sleep(setting.PROGRESS_STREAM_INTERVAL)
+
+
+def _job_stream(job: Job, stream_format: models.StreamFormat) -> StreamingResponse:
+    media_type = "text/event-stream" if stream_format == models.StreamFormat.SSE else "application/x-ndjson"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_job_events(job, stream_format), media_type=media_type, headers=headers)
+
+
 @router.post(
     "/clone",
     summary="Cloning a repository",
     response_model=models.BitbucketServerResponse,
     response_model_exclude_none=True,
+    status_code=202,
 )
 async def clone(
-    request: models.RepositoryCloneRequest = Depends(),
+    request: models.RepositoryCloneStreamRequest = Depends(),
     credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.git),
-) -> Union[models.BitbucketServerResponse, JSONResponse]:
+) -> Union[JSONResponse, StreamingResponse]:
+    def run(job: Job) -> None:
+        with tracing.span("api.clone", repository=request.name, job_id=job.id):
+            client = RepositoryGitClient(folder=request.name, credentials=credentials)
+            client.clone(
+                url=request.url,
+                branch=request.branch,
+                progress=job.update_progress,
+                strategy=request.strategy,
+                sparse_paths=request.sparse_path_list,
+                tracked_refs=request.tracked_ref_list,
+            )
+
     try:
-        client = RepositoryGitClient(folder=request.name, credentials=credentials)
-        client.clone(url=request.url, branch=request.branch)
-        return {"status": "success", "message": "The repository is cloned"}
-    except FileExistsError as e:
-        message = str(e)
-        status_code = 400
-    except Exception as e:
-        message = f"Internal error when cloning the repository: {e}"
-        status_code = 500
+        job = job_manager.submit("clone", request.name, run)
+    except JobQueueFull as e:
+        return _job_rejected(e)
 
-    content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
-    return JSONResponse(content=content, status_code=status_code)
+    if request.stream:
+        return _job_stream(job, request.stream)
+
+    return _job_accepted(job, "The cloning of the repository has been queued")
 
 
 @router.put(
@@ -87,24 +331,23 @@ async def clone(
     summary="Pulling up repository changes",
     response_model=models.BitbucketServerResponse,
     response_model_exclude_none=True,
+    status_code=202,
 )
 async def pull(
     request: models.RepositoryPullRequest = Depends(),
     credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.git),
-) -> Union[models.BitbucketServerResponse, JSONResponse]:
+) -> JSONResponse:
+    def run(job: Job) -> None:
+        with tracing.span("api.pull", repository=request.name, job_id=job.id):
+            client = RepositoryGitClient(folder=request.name, credentials=credentials)
+            client.pull(progress=job.update_progress)
+
     try:
-        client = RepositoryGitClient(folder=request.name, credentials=credentials)
-        client.pull()
-        return {"status": "success", "message": "The changes were pulled from the repository"}
-    except FileNotFoundError as e:
-        message = str(e)
-        status_code = 404
-    except Exception as e:
-        message = f"Internal error when extracting changes from the repository: {e}"
-        status_code = 500
+        job = job_manager.submit("pull", request.name, run)
+    except JobQueueFull as e:
+        return _job_rejected(e)
 
-    content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
-    return JSONResponse(content=content, status_code=status_code)
+    return _job_accepted(job, "Pulling the changes from the repository has been queued")
 
 
 @router.delete(
@@ -112,24 +355,23 @@ async def pull(
     summary="Deleting a cloned repository",
     response_model=models.BitbucketServerResponse,
     response_model_exclude_none=True,
+    status_code=202,
 )
-async def pull(
+async def delete(
     request: models.RepositoryDeleteRequest = Depends(),
     credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.git),
-) -> Union[models.BitbucketServerResponse, JSONResponse]:
+) -> JSONResponse:
+    def run(job: Job) -> None:
+        with tracing.span("api.delete", repository=request.name, job_id=job.id):
+            client = RepositoryGitClient(folder=request.name, credentials=credentials)
+            client.delete()
+
     try:
-        client = RepositoryGitClient(folder=request.name, credentials=credentials)
-        client.delete()
-        return {"status": "success", "message": "The cloned repository has been deleted"}
-    except FileNotFoundError as e:
-        message = str(e)
-        status_code = 404
-    except Exception as e:
-        message = f"Internal error when deleting a cloned repository: {e}"
-        status_code = 500
+        job = job_manager.submit("delete", request.name, run)
+    except JobQueueFull as e:
+        return _job_rejected(e)
 
-    content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
-    return JSONResponse(content=content, status_code=status_code)
+    return _job_accepted(job, "The deletion of the cloned repository has been queued")
 
 
 @router.get(
@@ -137,22 +379,70 @@ async def pull(
     summary="Determines if there are any new changes",
     response_model=models.BitbucketServerResponse,
     response_model_exclude_none=True,
+    status_code=202,
 )
 async def relevance(
     request: models.RepositoryRelevanceRequest = Depends(),
     credentials: Union[strategies.AuthStrategy, JSONResponse] = Depends(auth.git),
-) -> Union[models.BitbucketServerResponse, JSONResponse]:
+) -> JSONResponse:
     try:
-        client = RepositoryGitClient(folder=request.name, credentials=credentials)
-        status = client.relevance()
-        return {
-            "status": "success",
-            "message": "The cloned repository has been checked for updates",
-            "data": {"relevance": status},
-        }
+        async with AsyncUnitOfWork().start() as session:
+            db = AsyncRepositoryReadWrite(session)
+            db_repository = await db.get_by_name(request.name)
     except Exception as e:
         message = f"Internal error when checking the repository: {e}"
-        status_code = 500
+        content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
+        return JSONResponse(content=content, status_code=500)
 
-    content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
-    return JSONResponse(content=content, status_code=status_code)
+    known_commit = db_repository.last_commit_hash if db_repository else None
+
+    def run(job: Job) -> dict:
+        with tracing.span("api.relevance", repository=request.name, job_id=job.id):
+            client = RepositoryGitClient(folder=request.name, credentials=credentials)
+            return {"relevance": client.relevance(known_commit=known_commit)}
+
+    try:
+        job = job_manager.submit("relevance", request.name, run)
+    except JobQueueFull as e:
+        return _job_rejected(e)
+
+    return _job_accepted(job, "Checking the cloned repository for updates has been queued")
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Status, progress and result of a queued git operation",
+    response_model=models.BitbucketServerResponse,
+    response_model_exclude_none=True,
+)
+async def job_status(job_id: str) -> Union[models.BitbucketServerResponse, JSONResponse]:
+    job = job_manager.get(job_id)
+
+    if job is None:
+        content = models.BitbucketServerResponse(status="error", message="The job was not found.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=404)
+
+    return models.BitbucketServerResponse(
+        status="success",
+        message=f"The {job.operation} job is {job.status.value}.",
+        data={"job": job.to_dict()},
+    )
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    summary="Stream the progress of a queued git operation",
+    response_class=StreamingResponse,
+    response_model=None,
+)
+async def job_events(
+    job_id: str,
+    request: models.JobEventsRequest = Depends(),
+) -> Union[StreamingResponse, JSONResponse]:
+    job = job_manager.get(job_id)
+
+    if job is None:
+        content = models.BitbucketServerResponse(status="error", message="The job was not found.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=404)
+
+    return _job_stream(job, request.format)
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+
+from core.atlassian.api import models
+from core.atlassian.manager import RepoSyncManager
+from core.db.repositories import AsyncSyncRunReadWrite
+from core.db.unit_of_work import AsyncUnitOfWork
+
+router = APIRouter(prefix="/sync", tags=["Synchronization"])
+
+
+def sync_manager(request: Request) -> RepoSyncManager:
+    return request.app.state.sync_manager
+
+
+@router.get(
+    "/stats",
+    summary="State of the repository synchronization scheduler",
+    response_model=models.BitbucketServerResponse,
+    response_model_exclude_none=True,
+)
+async def stats(manager: RepoSyncManager = Depends(sync_manager)) -> models.BitbucketServerResponse:
+    return models.BitbucketServerResponse(
+        status="success",
+        message="The scheduler state was successfully received.",
+        data=manager.stats,
+    )
+
+
+@router.get(
+    "/repositories",
+    summary="Scheduled repositories with their effective polling intervals",
+    response_model=models.BitbucketServerResponse,
+    response_model_exclude_none=True,
+)
+async def repositories(manager: RepoSyncManager = Depends(sync_manager)) -> models.BitbucketServerResponse:
+    return models.BitbucketServerResponse(
+        status="success",
+        message="The scheduled repositories were successfully received.",
+        data={"repositories": manager.repositories()},
+    )
+
+
+@router.get(
+    "/runs/summary",
+    summary="Synchronization history per repository, the slowest repositories first",
+    response_model=models.BitbucketServerResponse,
+    response_model_exclude_none=True,
+)
+async def runs_summary(request: models.SyncRunSummaryRequest = Depends()):
+    since = datetime.now(timezone.utc) - timedelta(hours=request.hours)
+
+    try:
+        async with AsyncUnitOfWork().start() as session:
+            summary = await AsyncSyncRunReadWrite(session).summary(since, limit=request.limit)
+    except Exception as e:
+        message = f"Internal error when reading the synchronization history: {e}"
+        content = models.BitbucketServerResponse(status="error", message=message).model_dump(exclude_none=True)
+        return JSONResponse(content=content, status_code=500)
+
+    return models.BitbucketServerResponse(
+        status="success",
+        message="The synchronization history was successfully summarized.",
+        data={"since": since, "repositories": summary},
+    )
@@ -0,0 +1,138 @@
+import fnmatch
+import hashlib
+import hmac
+import json
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import JSONResponse
+
+from core.atlassian.api import models
+from core.atlassian.api.sync import sync_manager
+from core.atlassian.manager import RepoSyncManager
+from core.db.repositories import AsyncRepositoryReadWrite
+from core.db.unit_of_work import AsyncUnitOfWork
+from core.settings import setting
+
+router = APIRouter(prefix="/bitbucket/webhooks", tags=["Webhooks"])
+
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """
+    Checks the X-Hub-Signature header (sha256=<hmac>) that Bitbucket Server sends for webhooks with a secret.
+    Without a configured secret the payloads are rejected, unless unsigned webhooks are explicitly allowed.
+    """
+    secret = setting.BITBUCKET_WEBHOOK_SECRET
+
+    if not secret:
+        return setting.BITBUCKET_WEBHOOK_ALLOW_UNSIGNED
+
+    if not signature or not signature.startswith("sha256="):
+        return False
+
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256="))
+
+
+def hostname(url: Optional[str]) -> Optional[str]:
+    """
+    The host name of a URL, a bare host (with or without a port) is accepted as well.
+    """
+    if not url:
+        return None
+
+    return urlparse(url if "://" in url else f"//{url}").hostname
+
+
+def sender_host(repository: dict, host: Optional[str]) -> Optional[str]:
+    """
+    The host of the Bitbucket that sent the event. The links of the repository are used when the payload has them,
+    otherwise the host query parameter of the webhook URL.
+    """
+    for link in (repository.get("links") or {}).get("self") or []:
+        if hostname(link.get("href")):
+            return hostname(link.get("href"))
+
+    return hostname(host)
+
+
+def changed_branches(payload: dict) -> List[str]:
+    branches = []
+
+    for change in payload.get("changes") or []:
+        ref = change.get("ref") or {}
+
+        if ref.get("type", "BRANCH") != "BRANCH" or change.get("type") == "DELETE":
+            continue
+
+        branch = ref.get("displayId") or ref.get("id", "").removeprefix("refs/heads/")
+
+        if branch:
+            branches.append(branch)
+
+    return branches
+
+
+@router.post(
+    "",
+    summary="Receives push events from Bitbucket Server and triggers synchronization",
+    response_model=models.BitbucketServerResponse,
+    response_model_exclude_none=True,
+    status_code=202,
+)
+async def push(
+    request: Request,
+    event_key: Optional[str] = Header(None, alias="X-Event-Key"),
+    signature: Optional[str] = Header(None, alias="X-Hub-Signature"),
+    host: Optional[str] = Query(None, description="Host of the Bitbucket Server, if its payloads carry no links"),
+    manager: RepoSyncManager = Depends(sync_manager),
+) -> JSONResponse:
+    body = await request.body()
+
+    if not verify_signature(body, signature):
+        content = models.BitbucketServerResponse(status="error", message="Invalid webhook signature.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=401)
+
+    if event_key == "diagnostics:ping":
+        content = models.BitbucketServerResponse(status="success", message="The webhook is reachable.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=200)
+
+    try:
+        payload = json.loads(body)
+        repository = payload["repository"]
+        workspace = repository["project"]["key"]
+        slug = repository["slug"]
+        bitbucket = sender_host(repository, host)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        content = models.BitbucketServerResponse(status="error", message="Unsupported webhook payload.")
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=400)
+
+    if not bitbucket:
+        message = "The Bitbucket host is unknown, add ?host=<host> to the webhook URL."
+        content = models.BitbucketServerResponse(status="error", message=message)
+        return JSONResponse(content=content.model_dump(exclude_none=True), status_code=400)
+
+    branches = changed_branches(payload)
+    triggered = []
+
+    if branches:
+        async with AsyncUnitOfWork().start() as session:
+            db = AsyncRepositoryReadWrite(session)
+            db_repositories = await db.get_for_push(bitbucket, workspace, slug, branches)
+
+        for db_repository in db_repositories:
+            patterns = [db_repository.branch, *(db_repository.tracked_refs or [])]
+
+            if not any(fnmatch.fnmatchcase(branch, pattern) for branch in branches for pattern in patterns):
+                continue
+
+            await manager.trigger(str(db_repository.id), db_repository.name)
+            triggered.append(db_repository.name)
+
+    content = models.BitbucketServerResponse(
+        status="success",
+        message=f"Synchronization was requested for {len(triggered)} repositories.",
+        data={"repositories": triggered},
+    )
+    return JSONResponse(content=content.model_dump(exclude_none=True), status_code=202)
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+
+_MISSING = object()
+# The content is stored decoded, so the headers describing the original transfer no longer apply.
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire after a fixed time.
+    Concurrent loads of the same key, from threads or coroutines, are coalesced into a single loader call.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._loading: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value or calls the loader. Other threads asking for the same key
+        while it is being loaded wait for that result instead of calling the loader again.
+        """
+        value, future, owner = self._claim(key)
+
+        if value is not _MISSING:
+            return value
+
+        if not owner:
+            return future.result()
+
+        return self._resolve(key, future, loader)
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        The asynchronous variant of get_or_load, it shares the cache and the in-flight loads with it.
+        """
+        value, future, owner = self._claim(key)
+
+        if value is not _MISSING:
+            return value
+
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+        self._finish(key, future, value=value)
+        return value
+
+    def _claim(self, key: Hashable) -> Tuple[Any, Optional[Future], bool]:
+        with self._lock:
+            value = self._lookup(key)
+
+            if value is not _MISSING:
+                return value, None, False
+
+            future = self._loading.get(key)
+
+            if future is not None:
+                return _MISSING, future, False
+
+            future = self._loading[key] = Future()
+            return _MISSING, future, True
+
+    def _resolve(self, key: Hashable, future: Future, loader: Callable[[], Any]) -> Any:
+        try:
+            value = loader()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+        self._finish(key, future, value=value)
+        return value
+
+    def _finish(self, key: Hashable, future: Future, value: Any = None, error: Optional[BaseException] = None):
+        if error is None:
+            self.set(key, value)
+
+        with self._lock:
+            self._loading.pop(key, None)
+
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def _lookup(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+
+        if item is None:
+            return _MISSING
+
+        expires_at, value = item
+
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return _MISSING
+
+        return value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: List[Tuple[str, str]]
+    content: bytes
+    stored_at: float
+
+    @property
+    def etag(self) -> Optional[str]:
+        return next((value for name, value in self.headers if name.lower() == "etag"), None)
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return next((value for name, value in self.headers if name.lower() == "last-modified"), None)
+
+
+class ResponseCache:
+    """
+    LRU cache of successful GET responses, bounded by the number of entries and by their total size.
+    Fresh entries are served locally, stale ones are revalidated with If-None-Match / If-Modified-Since.
+    Keys include the credential identity, so a response is never served to another user.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]) -> Hashable:
+        authorization = headers.get("Authorization", "")
+        identity = hashlib.sha256(authorization.encode()).hexdigest() if authorization else ""
+        return identity, url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        max_age: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        Sends the GET through the cache. max_age overrides the TTL, 0 always asks the server.
+        """
+        headers = dict(headers or {})
+        key = self.key(url, params, headers)
+        ttl = self.ttl if max_age is None else max_age
+
+        with self._lock:
+            cached = self._data.get(key)
+
+            if cached is not None:
+                self._data.move_to_end(key)
+
+        if cached is not None and time.monotonic() - cached.stored_at < ttl:
+            return self._response(cached, url, params, headers)
+
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        response = await client.get(url, params=params, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            cached.stored_at = time.monotonic()
+            return self._response(cached, url, params, headers)
+
+        if response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", ""):
+            self._store(key, response)
+        elif cached is not None:
+            self.invalidate(key)
+
+        return response
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self._size = 0
+            elif key in self._data:
+                self._size -= len(self._data.pop(key).content)
+
+    def _store(self, key: Hashable, response: httpx.Response) -> None:
+        content = response.content
+
+        if len(content) > self.max_bytes:
+            return
+
+        entry = CachedResponse(
+            status_code=response.status_code,
+            headers=list(response.headers.multi_items()),
+            content=content,
+            stored_at=time.monotonic(),
+        )
+
+        with self._lock:
+            if key in self._data:
+                self._size -= len(self._data.pop(key).content)
+
+            self._data[key] = entry
+            self._size += len(content)
+
+            while len(self._data) > self.maxsize or self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted.content)
+
+    @staticmethod
+    def _response(
+        cached: CachedResponse, url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]
+    ) -> httpx.Response:
+        headers = {k: v for k, v in headers.items() if k not in ("If-None-Match", "If-Modified-Since")}
+        response_headers = [(k, v) for k, v in cached.headers if k.lower() not in DROPPED_HEADERS]
+        return httpx.Response(
+            status_code=cached.status_code,
+            headers=response_headers,
+            content=cached.content,
+            request=httpx.Request("GET", url, params=params, headers=headers),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,93 @@
+import importlib.util
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.settings import setting
+
+
+class HttpClientRegistry:
+    """
+    App-lifetime registry of HTTP clients for the Atlassian REST API.
+    Every host gets its own keep-alive connection pool, so repeated requests skip the TCP and TLS handshake.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Returns the pooled async client for the host of the url, creating it on first use.
+        """
+        host = self._host(base_url)
+        client = self._clients.get(host)
+
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=setting.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=setting.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=setting.HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(setting.HTTP_TIMEOUT, connect=setting.HTTP_CONNECT_TIMEOUT),
+                http2=self._http2(),
+            )
+            self._clients[host] = client
+
+        return client
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        A pooled blocking session for the code that runs in worker threads.
+        """
+        with self._lock:
+            if self._session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=setting.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    pool_maxsize=setting.HTTP_MAX_CONNECTIONS,
+                )
+                self._session = requests.Session()
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+
+            return self._session
+
+    async def aclose(self) -> None:
+        """
+        Closes all pooled connections. Called from the application lifespan on shutdown.
+        """
+        clients, self._clients = self._clients, {}
+
+        for client in clients.values():
+            await client.aclose()
+
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @staticmethod
+    def _host(base_url: str) -> str:
+        parsed = urlparse(str(base_url))
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    @staticmethod
+    def _http2() -> bool:
+        if not setting.HTTP2:
+            return False
+
+        if importlib.util.find_spec("h2") is None:
+            print("HTTP/2 is enabled but the 'h2' package is not installed — falling back to HTTP/1.1.")
+            return False
+
+        return True
+
+
+registry = HttpClientRegistry()
@@ -0,0 +1,157 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from core.settings import setting
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    operation: str
+    repository: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    version: int = 0
+
+    def update_progress(self, **progress: Any) -> None:
+        self.progress = {**self.progress, **progress}
+        self.version += 1
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "operation": self.operation,
+            "repository": self.repository,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+class JobManager:
+    """
+    Runs blocking git operations of the API in a bounded thread pool and keeps track of them as jobs.
+    Operations on the same repository are executed one after another.
+    """
+
+    ERROR_STATUS_CODES = {
+        FileExistsError: 400,
+        FileNotFoundError: 404,
+        ValueError: 400,
+    }
+
+    def __init__(self, workers: int = 4, queue_size: int = 100, retention: float = 3600.0):
+        """
+        At most queue_size jobs may wait or run at once, finished jobs are kept for retention seconds.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retention = retention
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, operation: str, repository: str, function: Callable[[Job], Any]) -> Job:
+        """
+        Queues the function for execution. It receives the job to report progress
+        and its return value becomes the result of the job.
+        """
+        with self._lock:
+            self._prune()
+
+            if sum(1 for job in self._jobs.values() if not job.finished) >= self.queue_size:
+                raise JobQueueFull("Too many git operations are in progress, try again later.")
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="git-job")
+
+            job = Job(operation=operation, repository=repository)
+            self._jobs[job.id] = job
+            repository_lock = self._locks.setdefault(repository, threading.Lock())
+
+        self._executor.submit(self._run, job, repository_lock, function)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, repository_lock: threading.Lock, function: Callable[[Job], Any]) -> None:
+        with repository_lock:
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job.version += 1
+
+            try:
+                job.result = function(job)
+                job.status_code = 200
+                status = JobStatus.SUCCEEDED
+            except Exception as e:
+                job.error = str(e)
+                job.status_code = self.ERROR_STATUS_CODES.get(type(e), 500)
+                status = JobStatus.FAILED
+
+            job.finished_at = datetime.now(timezone.utc)
+            job.status = status
+            job.version += 1
+
+    def _prune(self) -> None:
+        threshold = time.time() - self.retention
+
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at.timestamp() < threshold:
+                del self._jobs[job_id]
+
+        active = {job.repository for job in self._jobs.values() if not job.finished}
+
+        for repository in list(self._locks):
+            if repository not in active and not self._locks[repository].locked():
+                del self._locks[repository]
+
+
+job_manager = JobManager(
+    workers=setting.GIT_JOB_WORKERS,
+    queue_size=setting.GIT_JOB_QUEUE_SIZE,
+    retention=setting.GIT_JOB_RETENTION,
+)
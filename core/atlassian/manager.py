@@ -1,12 +1,25 @@
 import asyncio
+import os
+import random
+import socket
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from core.atlassian.service import RepositoryGitClient
+from core import metrics, tracing
+from core.atlassian.auth.strategies import BearerAuth
+from core.atlassian.resilience import CircuitBreakers, RetryPolicy, is_remote_failure
+from core.atlassian.scheduler import AdaptiveInterval, ScheduledRepository, SyncScheduler
+from core.atlassian.service import BitbucketHostProbe, BitbucketRepositoryClient, RepositoryGitClient
 from core.db.models import Repository, RepoStatus, SyncStatus
-from core.db.repositories import RepositoryReadWrite
-from core.db.unit_of_work import UnitOfWork
+from core.db.partitions import MonthlyPartitions
+from core.db.repositories import AsyncRepositoryReadWrite
+from core.db.unit_of_work import AsyncUnitOfWork
+from core.db.write_behind import SyncStatusBuffer
+from core.settings import setting
 
 
 def sync_interval_to_seconds(raw: Optional[int]) -> float:
@@ -16,130 +29,703 @@ def sync_interval_to_seconds(raw: Optional[int]) -> float:
     return float(raw) / 1000.0 if raw >= 1000 else float(raw)
 
 
+@dataclass(frozen=True)
+class BranchChange:
+    repository_id: str
+    repository_name: str
+    branch: str
+    old_commit: Optional[str]
+    new_commit: Optional[str]
+
+
 class RepoSyncManager:
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or setting.SYNC_WORKERS
+        self.scheduler = SyncScheduler(queue_size=self.workers, dispatch=self._dispatch)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="repo-sync")
         self._tasks: Dict[str, asyncio.Task] = {}
-        self._locks: Dict[str, asyncio.Lock] = {}
+        self._sweeps: Set[asyncio.Task] = set()
         self._global_lock = asyncio.Lock()
-        self.uow = UnitOfWork()
+        self.async_uow = AsyncUnitOfWork()
+        self.status = SyncStatusBuffer(uow=self.async_uow, interval=setting.SYNC_STATUS_FLUSH_INTERVAL)
+        self._listeners: List[Callable[[BranchChange], None]] = []
+        self.distributed = setting.SYNC_DISTRIBUTED
+        self.instance_id = setting.SYNC_INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self._leases: Dict[str, ScheduledRepository] = {}
+        # The adaptive interval of a claimed repository outlives its lease, everything else is loaded on every claim.
+        self._adaptive_intervals: Dict[str, AdaptiveInterval] = {}
+        self.breakers = CircuitBreakers()
+
+        metrics.scheduled_repositories.set_function(lambda: len(self.scheduler))
+        metrics.queue_depth.set_function(lambda: self.scheduler.queue_depth)
+        metrics.scheduling_lag.set_function(lambda: self.scheduler.lag)
+        metrics.pending_writes.set_function(lambda: len(self.status))
+
+    def add_listener(self, listener: Callable[[BranchChange], None]):
+        """
+        Registers a callback for changes of tracked branches. It is called from the sync worker threads.
+        """
+        self._listeners.append(listener)
 
     async def start_all(self):
-        with self.uow.start() as session:
-            query = session.query(Repository).filter(
-                Repository.status == RepoStatus.active,
-                Repository.active.is_(True),
-                Repository.enable_polling.is_(True),
-                Repository.auto_sync.is_(True),
-            )
-            repositories = [(str(r.id), r.name) for r in query.all()]
+        if self.distributed:
+            async with self._global_lock:
+                self._start_workers()
+                self._tasks["leases"] = asyncio.create_task(self._lease_loop())
+
+            print(f"Claiming repositories from the shared queue as '{self.instance_id}'.")
+            return
+
+        async with self.async_uow.start() as session:
+            db = AsyncRepositoryReadWrite(session)
+            repositories = [(str(r.id), r.name) for r in await db.get_for_sync()]
 
         for repository_id, repository_name in repositories:
             await self.start(repository_name, repository_id)
 
     async def start(self, repository_name: str, repository_id: Optional[str] = None):
         async with self._global_lock:
-            task = self._tasks.get(repository_id)
-
-            if task and not task.done():
-                print(f"[{repository_id}] Task already running — skip start.")
-                return
+            self._start_workers()
 
             if repository_id is None:
-                with self.uow.start() as session:
-                    db = RepositoryReadWrite(session)
-                    db_repository = db.get_by_name(repository_name)
+                async with self.async_uow.start() as session:
+                    db = AsyncRepositoryReadWrite(session)
+                    db_repository = await db.get_by_name(repository_name)
 
                     if not db_repository:
                         print(f"[{repository_name}] Cannot start: repository not found in DB.")
                         return
 
-                    repository_id = db_repository.id
+                    repository_id = str(db_repository.id)
+
+            if repository_id in self.scheduler:
+                print(f"[{repository_id}] Repository already scheduled — skip start.")
+                return
+
+            entry = ScheduledRepository(
+                repository_id=repository_id,
+                repository_name=repository_name,
+                interval=sync_interval_to_seconds(None),
+            )
+            self.scheduler.schedule(entry)
+            print(f"[{repository_id}] Scheduled polling for repository '{repository_name}'.")
+
+    async def trigger(self, repository_id: str, repository_name: str):
+        """
+        Requests an immediate synchronization, e.g. after a push event.
+        Bursts of triggers for one repository are coalesced into a single pull after the debounce delay.
+        """
+        if self.distributed:
+            async with self.async_uow.start() as session:
+                await AsyncRepositoryReadWrite(session).request_sync(repository_id)
+
+            print(f"[{repository_id}] Synchronization requested for repository '{repository_name}'.")
+            return
 
-            self._locks.setdefault(repository_id, asyncio.Lock())
+        async with self._global_lock:
+            self._start_workers()
 
-            task = asyncio.create_task(self._poll_loop(repository_id, repository_name))
-            self._tasks[repository_id] = task
-            print(f"[{repository_id}] Started polling task for repository '{repository_name}'.")
+            entry = self.scheduler.get(repository_id) or ScheduledRepository(
+                repository_id=repository_id,
+                repository_name=repository_name,
+                interval=sync_interval_to_seconds(None),
+            )
+            self.scheduler.trigger(entry, setting.WEBHOOK_DEBOUNCE)
+            print(f"[{repository_id}] Synchronization requested for repository '{repository_name}'.")
 
     async def stop(self, repository_id: str):
         async with self._global_lock:
-            task = self._tasks.pop(repository_id, None)
-
-            if task:
-                task.cancel()
+            self.scheduler.remove(repository_id)
+            self._adaptive_intervals.pop(repository_id, None)
 
     async def restart(self, repository_id: str):
+        entry = self.scheduler.get(repository_id)
+
+        if not entry:
+            return
+
         await self.stop(repository_id)
-        await self.start(repository_id)
+        await self.start(entry.repository_name, repository_id)
+
+    async def shutdown(self):
+        tasks = [*self._tasks.values(), *self._sweeps]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        # The leases are released only after the running git operations have finished and their statuses are written,
+        # so no other instance claims a repository in the middle of a pull.
+        await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
+        await self.status.stop()
+
+        for entry in list(self._leases.values()):
+            await self._finish(entry, None)
+
+    def _start_workers(self):
+        if "dispatcher" in self._tasks:
+            return
+
+        self._tasks["dispatcher"] = asyncio.create_task(self.scheduler.run())
+        self._tasks["maintenance"] = asyncio.create_task(self._maintenance_loop())
+        self.status.start()
+
+        for number in range(self.workers):
+            self._tasks[f"worker-{number}"] = asyncio.create_task(self._worker())
+
+        print(f"Started the sync scheduler with {self.workers} workers.")
+
+    async def _dispatch(self, entries: List[ScheduledRepository]):
+        if not setting.BITBUCKET_BATCH_PROBE:
+            for entry in entries:
+                await self.scheduler.enqueue(entry)
+            return
+
+        hosts: Dict[str, List[ScheduledRepository]] = defaultdict(list)
+
+        for entry in entries:
+            probed = entry.api_url and entry.last_commit_hash and not entry.triggered and not entry.tracked_refs
+
+            # The repositories of a paused or half-open host go to the workers: one of them probes it through allow(),
+            # the others are rescheduled without contacting the host.
+            if probed and not self.breakers.get(entry.clone_url).blocked:
+                hosts[entry.api_url].append(entry)
+            else:
+                await self.scheduler.enqueue(entry)
+
+        for api_url, group in hosts.items():
+            task = asyncio.create_task(self._sweep(api_url, group))
+            self._sweeps.add(task)
+            task.add_done_callback(self._sweeps.discard)
+
+    async def _sweep(self, api_url: str, entries: List[ScheduledRepository]):
+        """
+        Checks the heads of all due repositories of one Bitbucket host in a single pass.
+        Only the repositories whose head has changed are handed over to the workers for a git pull.
+        """
+        pending: List[ScheduledRepository] = []
+        changed: List[ScheduledRepository] = []
+        finished: List[Tuple[ScheduledRepository, Optional[float]]] = []
 
-    async def _poll_loop(self, repository_id: str, repository_name: str):
         try:
-            while True:
-                print(f"[{repository_id}] Checking repository '{repository_name}' for updates...")
+            async with self.async_uow.start() as session:
+                db = AsyncRepositoryReadWrite(session)
+                repository_ids = [entry.repository_id for entry in entries]
+                db_repositories = {str(r.id): r for r in await db.get_by_ids(repository_ids, with_branches=True)}
 
-                with self.uow.start() as session:
-                    db = RepositoryReadWrite(session)
-                    db_repository = db.get_by_id(repository_id)
+                for entry in entries:
+                    db_repository = db_repositories.get(entry.repository_id)
 
-                    if not db_repository:
-                        print(f"[{repository_id}] Repository record not found in DB — stopping polling loop.")
-                        break
+                    if not self._is_pollable(entry.repository_id, db_repository, entry.triggered):
+                        finished.append((entry, None))
+                        continue
+
+                    self._refresh(entry, db_repository)
+                    pending.append(entry)
 
-                    if db_repository.status != RepoStatus.active or not db_repository.active:
-                        print(f"[{repository_id}] Repository is not active — stopping polling loop.")
-                        break
+            targets = {}
 
-                    if not db_repository.enable_polling:
-                        print(f"[{repository_id}] Polling disabled for repository — stopping polling loop.")
-                        break
+            for entry in pending:
+                target = BitbucketRepositoryClient.parse_clone_url(entry.clone_url)
 
-                    if not db_repository.auto_sync:
-                        print(f"[{repository_id}] Auto-sync disabled for repository — stopping polling loop.")
-                        break
+                if target:
+                    targets[entry.repository_id] = (*target, entry.branch)
+                else:
+                    changed.append(entry)
 
-                    interval = sync_interval_to_seconds(db_repository.sync_interval)
+            token = setting.BITBUCKET_PROBE_TOKEN
+            probe = BitbucketHostProbe(
+                base_url=api_url,
+                credentials=BearerAuth(token) if token else None,
+                concurrency=setting.BITBUCKET_PROBE_CONCURRENCY,
+            )
+
+            timer = metrics.relevance_seconds.labels(method="rest").time()
+
+            with timer, tracing.span("sync.probe", host=api_url) as span:
+                heads = await probe.latest_commits(targets.values())
+                span.set(repositories=len(targets))
 
-                lock = self._locks.setdefault(repository_id, asyncio.Lock())
+            for entry in pending:
+                if entry.repository_id not in targets:
+                    continue
 
-                async with lock:
-                    print(f"[{repository_id}] Starting synchronization (blocking work will run in a thread)...")
-                    await asyncio.to_thread(self._do_sync, repository_id, repository_name)
+                head = heads.get(targets[entry.repository_id])
 
-                await asyncio.sleep(interval)
+                if head is not None and head == entry.last_commit_hash:
+                    print(f"[{entry.repository_id}] There are no changes for the repository")
+                    metrics.syncs_total.labels(status=SyncStatus.skipped.value).inc()
+                    finished.append((entry, self._next_interval(entry, changed=False)))
+                else:
+                    changed.append(entry)
         except asyncio.CancelledError:
-            print(f"[{repository_id}] Polling task was cancelled.")
             raise
         except Exception as e:
-            print(f"[{repository_id}] Polling loop exited with error: {e}")
+            print(f"[{api_url}] Batched probe failed, falling back to git: {e}")
+            finished_ids = {entry.repository_id for entry, _ in finished}
+            changed = [entry for entry in entries if entry.running and entry.repository_id not in finished_ids]
+
+        for entry, interval in finished:
+            await self._finish(entry, interval)
+
+        for entry in changed:
+            await self.scheduler.enqueue(entry)
+
+    async def _worker(self):
+        while True:
+            entry = await self.scheduler.next()
+            interval: Optional[float] = entry.effective_interval or entry.interval
+            entry.run = {"status": None, "commits": 0, "bytes_fetched": None, "objects_fetched": None, "error": None}
+            started_at, started = datetime.now(timezone.utc), time.monotonic()
+
+            cancelled = False
+
+            with tracing.span("sync", repository_id=entry.repository_id, triggered=entry.triggered) as span:
+                try:
+                    with metrics.active_syncs.track_inprogress():
+                        interval = await self._sync(entry)
+                except asyncio.CancelledError:
+                    # The sync thread may still be running, shutdown() releases the lease once it has finished.
+                    cancelled = True
+                    raise
+                except Exception as e:
+                    entry.run.update(status=SyncStatus.failed, error=str(e))
+                    print(f"[{entry.repository_id}] Synchronization failed with error: {e}")
+                finally:
+                    status = entry.run.get("status")
+                    span.set(repository=entry.repository_name, status=status.value if status else None)
+                    self._record_run(entry, started_at, time.monotonic() - started)
+
+                    if not cancelled:
+                        await self._finish(entry, interval)
+
+    def _record_run(self, entry: ScheduledRepository, started_at: datetime, duration: float):
+        status = entry.run.get("status")
+
+        if status is not None:
+            metrics.syncs_total.labels(status=status.value).inc()
+
+        if entry.run.get("bytes_fetched"):
+            metrics.fetched_bytes_total.inc(entry.run["bytes_fetched"])
+
+        if entry.run.get("objects_fetched"):
+            metrics.fetched_objects_total.inc(entry.run["objects_fetched"])
+
+        if status is None or (status == SyncStatus.skipped and not setting.SYNC_RUNS_RECORD_SKIPPED):
+            return
+
+        self.status.record_run(
+            {
+                "repository_id": entry.repository_id,
+                "started_at": started_at,
+                "finished_at": datetime.now(timezone.utc),
+                "duration_ms": int(duration * 1000),
+                "status": status,
+                "triggered": entry.triggered,
+                "commits": entry.run.get("commits", 0),
+                "bytes_fetched": entry.run.get("bytes_fetched"),
+                "error": entry.run.get("error"),
+                "instance": self.instance_id,
+            }
+        )
+
+    async def _maintenance_loop(self):
+        """
+        Keeps monthly partitions of the sync_runs history ahead of time and drops the expired ones.
+        """
+        partitions = MonthlyPartitions("sync_runs", "started_at", self.async_uow)
+
+        while True:
+            try:
+                dropped = await partitions.maintain(
+                    months_ahead=setting.SYNC_RUNS_PARTITIONS_AHEAD,
+                    retention_days=setting.SYNC_RUNS_RETENTION_DAYS,
+                )
+
+                if dropped:
+                    print(f"Dropped expired sync history partitions: {', '.join(dropped)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Failed to maintain the sync history partitions: {e}")
+
+            await asyncio.sleep(setting.SYNC_RUNS_MAINTENANCE_INTERVAL)
+
+    async def _finish(self, entry: ScheduledRepository, interval: Optional[float]):
+        """
+        Reschedules the repository locally or, in distributed mode, releases its lease
+        so that any instance can claim it once it is due again. The failure count goes with the lease,
+        the adaptive interval is kept for the next claim unless the repository is no longer due at all.
+        """
+        if entry.repository_id not in self._leases:
+            self.scheduler.done(entry, interval)
+            return
+
+        # A retry of a requested synchronization goes back to the shared queue as well:
+        # rescheduled locally it would run without a lease, next to another instance that claims the repository.
+        if entry.pending is not None:
+            interval = entry.pending if interval is None else min(interval, entry.pending)
+            entry.pending = None
+
+        self.scheduler.done(entry, None)
+        del self._leases[entry.repository_id]
+
+        if interval is None or entry.adaptive is None:
+            self._adaptive_intervals.pop(entry.repository_id, None)
+        else:
+            self._adaptive_intervals[entry.repository_id] = entry.adaptive
+
+        try:
+            # The next claimer must see the status and the last commit of this run, not the one before it.
+            await self.status.flush(entry.repository_id)
+
+            async with self.async_uow.start() as session:
+                db = AsyncRepositoryReadWrite(session)
+                await db.release(entry.repository_id, self.instance_id, interval, failures=entry.failures)
+        except Exception as e:
+            print(f"[{entry.repository_id}] Failed to release the lease, it will expire: {e}")
+
+    async def _lease_loop(self):
+        """
+        Claims due repositories while there are free workers and renews the leases
+        of the ones in progress, well before they expire.
+        """
+        lease = setting.SYNC_LEASE_DURATION
+        renewed_at = time.monotonic()
+
+        while True:
+            try:
+                if self._leases and time.monotonic() - renewed_at >= lease / 3:
+                    await self._renew_leases(lease)
+                    renewed_at = time.monotonic()
+
+                capacity = self.workers - len(self._leases)
+
+                if capacity > 0:
+                    async with self.async_uow.start() as session:
+                        db = AsyncRepositoryReadWrite(session)
+                        claimed = await db.get_for_pulling(self.instance_id, limit=capacity, lease=lease)
+
+                    for db_repository in claimed:
+                        self._claimed(db_repository)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Failed to claim repositories: {e}")
+
+            await asyncio.sleep(setting.SYNC_CLAIM_INTERVAL)
+
+    def _claimed(self, db_repository: Repository):
+        repository_id = str(db_repository.id)
+        # Another instance may have synchronized the repository since this one held the lease,
+        # so the heads and the failure count come from the claimed row.
+        entry = self.scheduler.get(repository_id) or ScheduledRepository(
+            repository_id=repository_id,
+            repository_name=db_repository.name,
+            interval=sync_interval_to_seconds(db_repository.sync_interval),
+            adaptive=self._adaptive_intervals.get(repository_id),
+        )
+        entry.last_commit_hash = db_repository.last_commit_hash
+        entry.branch_heads = None
+        entry.failures = db_repository.sync_failures or 0
+        # Webhook-only repositories are claimed only after a requested synchronization.
+        entry.triggered = not db_repository.enable_polling
+        self._leases[repository_id] = entry
+        self.scheduler.schedule(entry)
+
+    async def _renew_leases(self, lease: float):
+        async with self.async_uow.start() as session:
+            db = AsyncRepositoryReadWrite(session)
+            renewed = set(await db.renew_leases(self.instance_id, list(self._leases), lease=lease))
+
+        for repository_id in set(self._leases) - renewed:
+            print(f"[{repository_id}] The lease was lost, another instance may synchronize the repository.")
+
+    async def _sync(self, entry: ScheduledRepository) -> Optional[float]:
+        repository_id = entry.repository_id
+        print(f"[{repository_id}] Checking repository '{entry.repository_name}' for updates...")
+
+        async with self.async_uow.start() as session:
+            db = AsyncRepositoryReadWrite(session)
+
+            with tracing.span("db.load", repository_id=repository_id):
+                db_repository = await db.get_by_id(repository_id, with_branches=True)
+
+            if not self._is_pollable(repository_id, db_repository, entry.triggered):
+                return None
+
+            self._refresh(entry, db_repository)
+            polling = db_repository.enable_polling
+
+        if self.distributed and not RepositoryGitClient(folder=entry.repository_name).path.exists():
+            # Every instance needs the working clones under REPOSITORIES_STORAGE, the others may have this one.
+            print(f"[{repository_id}] The working clone is missing on this instance, leaving it to the others.")
+            entry.run["status"] = SyncStatus.skipped
+            return entry.interval
+
+        breaker = self.breakers.get(entry.clone_url)
+
+        if not breaker.allow():
+            # Spread the paused repositories, so they do not all return at the moment the host recovers.
+            delay = breaker.retry_after + random.uniform(0.0, breaker.reset_timeout)
+            print(f"[{repository_id}] The host '{breaker.name}' is paused, next attempt in {delay:.1f} seconds.")
+            entry.run["status"] = SyncStatus.skipped
+            return self._retry_later(entry, delay)
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            changed = await loop.run_in_executor(self._executor, tracing.tracer.propagate(self._do_sync), entry)
+        except Exception as e:
+            # Only failures of the host pause it, a broken local clone must not stop its healthy neighbours.
+            if not is_remote_failure(e):
+                raise
+
+            breaker.failure()
+            entry.failures += 1
+
+            if entry.failures >= entry.max_retries:
+                attempts, entry.failures = entry.failures, 0
+                raise Exception(f"Gave up after {attempts} attempts: {e}") from e
+
+            # The retry goes through the scheduler, neither a thread nor a worker waits for it.
+            policy = RetryPolicy(
+                base=entry.retry_delay,
+                factor=setting.SYNC_RETRY_FACTOR,
+                maximum=setting.SYNC_RETRY_MAX_DELAY,
+            )
+            delay = policy.delay(entry.failures)
+            entry.run.update(status=SyncStatus.failed, error=str(e))
+            attempt = f"Attempt {entry.failures} of {entry.max_retries}"
+            print(f"[{repository_id}] {attempt} failed, retrying in {delay:.1f} seconds: {e}")
+            return self._retry_later(entry, delay)
+
+        breaker.success()
+        entry.failures = 0
+        return self._next_interval(entry, changed) if polling else None
+
+    @staticmethod
+    def _retry_later(entry: ScheduledRepository, delay: float) -> float:
+        """
+        A requested synchronization stays requested until it has run, even for repositories that are not polled.
+        """
+        if entry.triggered:
+            entry.pending = delay
+
+        return delay
+
+    @staticmethod
+    def _is_pollable(repository_id: str, db_repository: Optional[Repository], triggered: bool = False) -> bool:
+        if not db_repository:
+            print(f"[{repository_id}] Repository record not found in DB — stopping polling.")
+            return False
+
+        if db_repository.status != RepoStatus.active or not db_repository.active:
+            print(f"[{repository_id}] Repository is not active — stopping polling.")
+            return False
+
+        if not db_repository.enable_polling and not (triggered and db_repository.enable_webhooks):
+            print(f"[{repository_id}] Polling disabled for repository — stopping polling.")
+            return False
+
+        if not db_repository.auto_sync:
+            print(f"[{repository_id}] Auto-sync disabled for repository — stopping polling.")
+            return False
+
+        return True
+
+    def _refresh(self, entry: ScheduledRepository, db_repository: Repository):
+        entry.interval = sync_interval_to_seconds(db_repository.sync_interval)
+
+        if db_repository.enable_webhooks:
+            entry.interval = max(entry.interval, setting.WEBHOOK_FALLBACK_INTERVAL)
+
+        entry.webhooks = db_repository.enable_webhooks
+        entry.api_url = db_repository.api_url
+        entry.clone_url = db_repository.clone_url
+        entry.branch = db_repository.branch
+        entry.tracked_refs = list(db_repository.tracked_refs or [])
+
+        if entry.branch_heads is None:
+            entry.branch_heads = {b.name: b.last_commit_hash for b in db_repository.branches if b.last_commit_hash}
+        entry.max_retries = int(db_repository.max_retries or 3)
+        entry.retry_delay = float((db_repository.retry_delay or 1000) / 1000.0)
+        entry.last_commit_hash = (
+            self.status.get(entry.repository_id, "last_commit_hash") or db_repository.last_commit_hash
+        )
+
+    @staticmethod
+    def _next_interval(entry: ScheduledRepository, changed: bool) -> float:
+        """
+        The interval until the next poll: the configured one or, in adaptive mode,
+        one that follows the observed commit frequency of the repository.
+        """
+        if setting.SYNC_ADAPTIVE and not entry.webhooks:
+            if entry.adaptive is None:
+                entry.adaptive = AdaptiveInterval(
+                    minimum=setting.SYNC_INTERVAL_MIN,
+                    maximum=setting.SYNC_INTERVAL_MAX,
+                    factor=setting.SYNC_BACKOFF_FACTOR,
+                )
+
+            entry.effective_interval = entry.adaptive.observe(changed, entry.interval)
+        else:
+            entry.effective_interval = entry.interval
+
+        return entry.effective_interval
+
+    def _do_sync(self, entry: ScheduledRepository) -> bool:
+        repository_id = entry.repository_id
+        client = RepositoryGitClient(
+            folder=entry.repository_name,
+            repository_id=repository_id,
+            status_buffer=self.status,
+        )
+
+        if entry.tracked_refs:
+            return self._sync_branches(client, entry)
+
+        with metrics.relevance_seconds.labels(method="git").time():
+            unchanged = client.relevance(known_commit=entry.last_commit_hash)
+
+        if unchanged:
+            print(f"[{repository_id}] There are no changes for the repository")
+            entry.run["status"] = SyncStatus.skipped
+            return False
 
-    def _do_sync(self, repository_id: str, repository_name: str):
-        client = RepositoryGitClient(folder=repository_name)
+        self._pull(client, entry)
+        return True
 
-        if client.relevance():
+    def _sync_branches(self, client: RepositoryGitClient, entry: ScheduledRepository) -> bool:
+        """
+        Checks all tracked branches with one ls-remote and fetches the changed ones with one fetch.
+        The main branch is pulled into the working tree as usual.
+        """
+        repository_id = entry.repository_id
+
+        with metrics.relevance_seconds.labels(method="ls-remote").time():
+            heads = client.tracked_branches(client.remote_heads(), entry.branch, entry.tracked_refs)
+
+        known = entry.branch_heads or {}
+
+        changes = {name: (known.get(name), hexsha) for name, hexsha in heads.items() if known.get(name) != hexsha}
+        changes.update({name: (hexsha, None) for name, hexsha in known.items() if name not in heads})
+
+        if not changes:
             print(f"[{repository_id}] There are no changes for the repository")
-            return
+            entry.run["status"] = SyncStatus.skipped
+            return False
 
-        with self.uow.start() as session:
-            db = RepositoryReadWrite(session)
-            db_repository = db.get_by_id(repository_id)
+        entry.run["status"] = SyncStatus.success
 
-            db_repository.last_sync_status = SyncStatus.in_progress
-            db_repository.last_sync_at = datetime.now(timezone.utc)
+        fetched = {name: change for name, change in changes.items() if change[1] and name != entry.branch}
 
-            max_retries = int(db_repository.max_retries or 3)
-            retry_delay = float((db_repository.retry_delay or 1000) / 1000.0)
-            session.commit()
+        with metrics.fetch_seconds.labels(operation="fetch").time():
+            client.fetch_branches(fetched)
 
-        for attempt in range(1, max_retries + 1):
+        for name, (old, new) in fetched.items():
+            client.save_commits(client.commit_rows(name, old, new))
+
+        if entry.branch in heads and heads[entry.branch] != entry.last_commit_hash:
             try:
-                print(f"[{repository_id}] There are changes, pooling")
-                client.pull()
-                return
+                self._pull(client, entry)
             except Exception:
-                attempt += 1
+                # The other branches are done, only the main branch keeps its old head and is pulled again next time.
+                changes.pop(entry.branch, None)
+                heads = {name: hexsha for name, hexsha in heads.items() if name != entry.branch}
+
+                if entry.branch in known:
+                    heads[entry.branch] = known[entry.branch]
+
+                self._record_branch_changes(entry, heads, changes)
+                raise
+
+        self._record_branch_changes(entry, heads, changes)
+        return True
+
+    def _record_branch_changes(
+        self,
+        entry: ScheduledRepository,
+        heads: Dict[str, str],
+        changes: Dict[str, Tuple[Optional[str], Optional[str]]],
+    ):
+        self.status.record_branches(entry.repository_id, {name: new for name, (_, new) in changes.items()})
+        entry.branch_heads = heads
+
+        for name, (old, new) in changes.items():
+            self._notify(BranchChange(entry.repository_id, entry.repository_name, name, old, new))
+
+    def _notify(self, change: BranchChange):
+        print(f"[{change.repository_id}] Branch '{change.branch}': {change.old_commit} -> {change.new_commit}")
+
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"[{change.repository_id}] Branch change listener failed: {e}")
+
+    def _pull(self, client: RepositoryGitClient, entry: ScheduledRepository):
+        repository_id = entry.repository_id
 
-                if attempt < max_retries:
-                    time.sleep(retry_delay)
+        self.status.record(
+            repository_id,
+            last_sync_status=SyncStatus.in_progress,
+            last_sync_at=datetime.now(timezone.utc),
+        )
+
+        def progress(**update: Any):
+            if update.get("bytes"):
+                entry.run["bytes_fetched"] = update["bytes"]
+
+            if update.get("phase") == "receiving" and update.get("total"):
+                entry.run["objects_fetched"] = update["total"]
+
+        print(f"[{repository_id}] There are changes, pooling")
+
+        try:
+            timer = metrics.fetch_seconds.labels(operation="pull").time()
+
+            with timer, tracing.span("sync.pull", attempt=entry.failures + 1):
+                fetched = client.pull(progress=progress)
+        except Exception:
+            metrics.sync_failures_total.inc()
+            raise
+
+        metrics.fetched_refs_total.inc(len(fetched))
+        entry.run.update(status=SyncStatus.success, commits=client.pulled_commits, error=None)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "scheduled": len(self.scheduler),
+            "in_flight": self.scheduler.in_flight,
+            "queue_depth": self.scheduler.queue_depth,
+            "lag": round(self.scheduler.lag, 3),
+            "pending_status_writes": len(self.status),
+            "instance": self.instance_id if self.distributed else None,
+            "leases": len(self._leases) if self.distributed else None,
+            "paused_hosts": self.breakers.open(),
+        }
+
+    def repositories(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+
+        return [
+            {
+                "id": entry.repository_id,
+                "name": entry.repository_name,
+                "interval": entry.interval,
+                "effective_interval": entry.effective_interval or entry.interval,
+                "commit_gap": entry.adaptive.commit_gap if entry.adaptive else None,
+                "due_in": round(max(entry.due_at - now, 0.0), 3),
+                "running": entry.running,
+                "branches": entry.branch_heads if entry.tracked_refs else None,
+            }
+            for entry in self.scheduler.entries()
+        ]
 
     @property
     def tasks(self):
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from git import Repo
+
+from core.settings import setting
+
+
+class SharedObjectStore:
+    """
+    Bare cache repositories, one per upstream, whose objects are shared by the working clones through alternates.
+    Every fetch goes to the cache first, so the working clones only have to update their refs.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or setting.GIT_SHARED_OBJECTS_STORAGE or Path(setting.REPOSITORIES_STORAGE) / ".objects")
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> str:
+        """
+        Identifies the upstream regardless of credentials, letter case of the host and a trailing .git.
+        """
+        parsed = urlparse(url)
+
+        if parsed.scheme and parsed.netloc:
+            host = parsed.netloc.rpartition("@")[2].lower()
+            url = f"{parsed.scheme}://{host}{parsed.path}"
+
+        url = url.rstrip("/")
+
+        if url.endswith(".git"):
+            url = url[: -len(".git")]
+
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def path(self, url: str) -> Path:
+        return self.root / f"{self.key(url)}.git"
+
+    def fetch(self, url: str, fetch_url: str, branch: str) -> Path:
+        """
+        Creates the cache of the upstream if needed and fetches the branch into it.
+        fetch_url may contain credentials, it is passed on the command line and never stored in the cache.
+        """
+        path = self.path(url)
+
+        with self._repository_lock(path):
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                cache = Repo.init(path, bare=True)
+
+                with cache.config_writer() as config:
+                    # The working clones depend on these objects, they must never be pruned.
+                    config.set_value("gc", "auto", 0)
+                    config.set_value("gc", "pruneExpire", "never")
+            else:
+                cache = Repo(path)
+
+            try:
+                cache.git.fetch(fetch_url, f"+refs/heads/{branch}:refs/heads/{branch}", "--no-tags")
+            finally:
+                cache.close()
+
+        return path
+
+    @staticmethod
+    def uses(repository: Repo) -> bool:
+        """
+        Whether the working clone borrows objects from a cache.
+        """
+        return (Path(repository.git_dir) / "objects" / "info" / "alternates").exists()
+
+    def _repository_lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(str(path), threading.Lock())
+
+
+object_store = SharedObjectStore() if setting.GIT_SHARED_OBJECTS else None
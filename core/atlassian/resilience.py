@@ -0,0 +1,187 @@
+import random
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from git import GitCommandError
+
+from core.settings import setting
+
+# The messages of git (and of curl and ssh under it) when the remote cannot be reached or fails on its side.
+REMOTE_GIT_ERRORS = re.compile(
+    r"could not resolve host|failed to connect|connection (refused|reset|timed out)|operation timed out|"
+    r"network is unreachable|no route to host|ssh: connect to host|the remote end hung up|early eof|"
+    r"rpc failed|returned error: 5\d\d|http 5\d\d|gnutls_handshake|ssl_(connect|read|write)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with jitter: the n-th retry waits between half and all of base * factor^(n - 1),
+    capped at maximum. The random half spreads out the retries of repositories that failed together.
+    """
+
+    base: float = 1.0
+    factor: float = 2.0
+    maximum: float = 300.0
+
+    def delay(self, attempt: int) -> float:
+        """
+        The pause after the given failed attempt, counted from 1.
+        """
+        backoff = min(self.maximum, self.base * self.factor ** max(attempt - 1, 0))
+        return backoff / 2 + random.uniform(0.0, backoff / 2)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Stops the synchronizations against a host after a series of consecutive failures.
+    While open nothing is sent. After the reset timeout a single probe is let through (half-open):
+    its success closes the circuit, a failure opens it again for twice as long, up to the maximum.
+    Only used from the event loop, so there is no locking.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, reset_timeout: float = 30.0, max_reset_timeout: float = 600.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    @property
+    def retry_after(self) -> float:
+        """
+        Seconds until the next probe may be sent, 0 if requests are let through now.
+        """
+        if self.state == CircuitState.CLOSED:
+            return 0.0
+
+        started = self._probe_started if self.state == CircuitState.HALF_OPEN else self._opened_at
+        return max(started + self._timeout - time.monotonic(), 0.0)
+
+    @property
+    def blocked(self) -> bool:
+        """
+        Whether requests that do not go through allow() must keep away from the host. That holds until a probe
+        has closed the circuit, even once the reset timeout is over, so only the single probe reaches the host.
+        """
+        return self.state != CircuitState.CLOSED
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now. In the half-open state only the probe is allowed,
+        a probe that never reported back is replaced after the reset timeout.
+        """
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        if self.retry_after > 0:
+            return False
+
+        self.state = CircuitState.HALF_OPEN
+        self._probe_started = time.monotonic()
+        return True
+
+    def success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            print(f"[{self.name}] The host is reachable again, the circuit is closed.")
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._timeout = self.reset_timeout
+        self._probe_started = None
+
+    def failure(self) -> None:
+        self.failures += 1
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._timeout = min(self._timeout * 2, self.max_reset_timeout)
+        elif self.state == CircuitState.OPEN or self.failures < self.threshold:
+            return
+
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+        print(f"[{self.name}] {self.failures} failures in a row, pausing the host for {self._timeout:.0f} seconds.")
+
+
+def is_remote_failure(error: Optional[BaseException]) -> bool:
+    """
+    Whether the error comes from the host: connection and timeout errors, git transport errors and HTTP 5xx.
+    Local problems such as a missing clone, a merge conflict or a database error are not held against the host.
+    Wrapped errors are followed through their causes.
+    """
+    seen = set()
+
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+
+        if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+            return True
+
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+
+        if isinstance(error, GitCommandError):
+            return bool(REMOTE_GIT_ERRORS.search(f"{error.stderr} {error.stdout}"))
+
+        error = error.__cause__ or error.__context__
+
+    return False
+
+
+def host_of(url: Optional[str]) -> str:
+    """
+    The host of a clone url without credentials, scp-like ssh urls (git@host:project/repo.git) included.
+    """
+    if not url:
+        return ""
+
+    parsed = urlparse(url)
+
+    if parsed.scheme and (parsed.netloc or parsed.scheme == "file"):
+        return parsed.netloc.rpartition("@")[2].lower() or parsed.scheme
+
+    return url.rpartition("@")[2].partition(":")[0].lower()
+
+
+class CircuitBreakers:
+    """
+    One circuit breaker per host, created on first use.
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, url: Optional[str]) -> CircuitBreaker:
+        host = host_of(url)
+        breaker = self._breakers.get(host)
+
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                name=host,
+                threshold=setting.CIRCUIT_BREAKER_THRESHOLD,
+                reset_timeout=setting.CIRCUIT_BREAKER_RESET_TIMEOUT,
+                max_reset_timeout=setting.CIRCUIT_BREAKER_MAX_RESET_TIMEOUT,
+            )
+
+        return breaker
+
+    def open(self) -> List[str]:
+        return [host for host, breaker in self._breakers.items() if breaker.state != CircuitState.CLOSED]
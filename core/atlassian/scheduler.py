@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import itertools
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+@dataclass
+class AdaptiveInterval:
+    """
+    Moves the polling interval of a repository between the bounds depending on how often commits arrive.
+    A detected change brings the interval back to the configured one (or lower for busy repositories),
+    every quiet poll multiplies it by the backoff factor.
+    """
+
+    minimum: float
+    maximum: float
+    factor: float = 2.0
+    history: Deque[float] = field(default_factory=lambda: deque(maxlen=16))
+    current: Optional[float] = None
+
+    def observe(self, changed: bool, base: float) -> float:
+        """
+        Records the result of a poll and returns the interval until the next one.
+        """
+        if changed:
+            self.history.append(time.time())
+            self.current = min(base, self.commit_gap / 2) if self.commit_gap else base
+        elif self.current is None:
+            self.current = base
+        else:
+            self.current *= self.factor
+
+        self.current = min(max(self.current, self.minimum), self.maximum)
+        return self.current
+
+    @property
+    def commit_gap(self) -> Optional[float]:
+        """
+        The median time between the recently detected changes, None until there are two of them.
+        """
+        if len(self.history) < 2:
+            return None
+
+        moments = list(self.history)
+        return statistics.median(later - earlier for earlier, later in zip(moments, moments[1:]))
+
+
+@dataclass
+class ScheduledRepository:
+    repository_id: str
+    repository_name: str
+    interval: float
+    due_at: float = 0.0
+    running: bool = False
+    started: bool = False
+    triggered: bool = False
+    pending: Optional[float] = None
+    effective_interval: Optional[float] = None
+    adaptive: Optional[AdaptiveInterval] = None
+
+    api_url: Optional[str] = None
+    clone_url: Optional[str] = None
+    branch: Optional[str] = None
+    last_commit_hash: Optional[str] = None
+    tracked_refs: List[str] = field(default_factory=list)
+    branch_heads: Optional[Dict[str, str]] = None
+    webhooks: bool = False
+    max_retries: int = 3
+    retry_delay: float = 1.0
+    failures: int = 0
+    run: Dict[str, Any] = field(default_factory=dict)
+
+
+class SyncScheduler:
+    """
+    A min-heap of repositories ordered by the time of their next synchronization.
+    Due repositories are handed over to the workers through a bounded queue.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 0,
+        batch_size: int = 512,
+        dispatch: Optional[Callable[[List[ScheduledRepository]], Awaitable[None]]] = None,
+    ):
+        """
+        The queue size limits how many due repositories may wait for a free worker.
+        Everything beyond that stays in the heap, so the oldest due repository always goes first.
+        The dispatch callback receives batches of up to batch_size due repositories,
+        by default they are enqueued as is.
+        """
+        self._dispatch = dispatch or self._enqueue_all
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._entries: Dict[str, ScheduledRepository] = {}
+        self._queue: asyncio.Queue[ScheduledRepository] = asyncio.Queue(maxsize=queue_size)
+        self._wakeup = asyncio.Event()
+        self._lag = 0.0
+        self._batch_size = batch_size
+
+    def __contains__(self, repository_id: str) -> bool:
+        return repository_id in self._entries
+
+    def get(self, repository_id: str) -> Optional[ScheduledRepository]:
+        return self._entries.get(repository_id)
+
+    def schedule(self, entry: ScheduledRepository, delay: float = 0.0) -> None:
+        """
+        Puts the repository into the heap to be synchronized after the delay (in seconds).
+        Rescheduling replaces the previous due time, the outdated heap item is skipped lazily.
+        """
+        entry.due_at = time.monotonic() + delay
+        self._entries[entry.repository_id] = entry
+
+        if not entry.running:
+            heapq.heappush(self._heap, (entry.due_at, next(self._counter), entry.repository_id))
+            self._wakeup.set()
+
+    def remove(self, repository_id: str) -> Optional[ScheduledRepository]:
+        """
+        Stops scheduling the repository. A synchronization that is already running is not interrupted.
+        """
+        return self._entries.pop(repository_id, None)
+
+    def done(self, entry: ScheduledRepository, interval: Optional[float]) -> None:
+        """
+        Called by a worker when the synchronization is finished.
+        The repository is scheduled again after the interval or forgotten if the interval is None.
+        """
+        entry.running = False
+        entry.started = False
+
+        if self._entries.get(entry.repository_id) is not entry:
+            return
+
+        if entry.pending is not None:
+            interval = entry.pending if interval is None else min(interval, entry.pending)
+            entry.pending = None
+        else:
+            entry.triggered = False
+
+        if interval is None:
+            self.remove(entry.repository_id)
+            return
+
+        self.schedule(entry, interval)
+
+    def trigger(self, entry: ScheduledRepository, delay: float = 0.0) -> None:
+        """
+        Requests an out-of-band synchronization after the delay.
+        Repeated triggers before the repository is picked up are coalesced into one synchronization,
+        a trigger that arrives while it is running schedules exactly one more run afterwards.
+        """
+        entry.triggered = True
+
+        if entry.running:
+            entry.pending = delay
+            return
+
+        if self._entries.get(entry.repository_id) is entry and entry.due_at <= time.monotonic() + delay:
+            return
+
+        self.schedule(entry, delay)
+
+    async def enqueue(self, entry: ScheduledRepository) -> None:
+        """
+        Hands a due repository over to the workers, waiting while the queue is full.
+        """
+        await self._queue.put(entry)
+
+    async def _enqueue_all(self, entries: List[ScheduledRepository]) -> None:
+        for entry in entries:
+            await self.enqueue(entry)
+
+    async def next(self) -> ScheduledRepository:
+        """
+        Waits for the next due repository. Used by the workers.
+        """
+        entry = await self._queue.get()
+        entry.started = True
+        self._lag = max(time.monotonic() - entry.due_at, 0.0)
+        return entry
+
+    async def run(self) -> None:
+        """
+        The dispatcher loop: passes due repositories from the heap to the dispatch callback
+        and sleeps until the earliest due time or until something is rescheduled.
+        """
+        while True:
+            self._wakeup.clear()
+            batch: List[ScheduledRepository] = []
+
+            while self._heap and self._heap[0][0] <= time.monotonic() and len(batch) < self._batch_size:
+                due_at, _, repository_id = heapq.heappop(self._heap)
+                entry = self._entries.get(repository_id)
+
+                if entry is None or entry.running or entry.due_at != due_at:
+                    continue
+
+                entry.running = True
+                batch.append(entry)
+
+            if batch:
+                await self._dispatch(batch)
+                continue
+
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of repositories that are due but not yet picked up by a worker.
+        """
+        now = time.monotonic()
+        return sum(1 for entry in self._entries.values() if not entry.started and entry.due_at <= now)
+
+    @property
+    def lag(self) -> float:
+        """
+        How late (in seconds) the last repository was picked up relative to its due time.
+        """
+        return self._lag
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of repositories taken from the heap and not finished yet.
+        """
+        return sum(1 for entry in self._entries.values() if entry.running)
+
+    def entries(self) -> List[ScheduledRepository]:
+        return list(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,38 +1,72 @@
+import asyncio
+import fnmatch
+import re
 import shutil
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import httpx
-import requests
-from git import FetchInfo, GitCommandError, Repo
+from git import FetchInfo, GitCommandError, RemoteProgress, Repo
 from git.exc import NoSuchPathError
 from git.util import IterableList
 from pydantic import HttpUrl
 
 import version
+from core import tracing
 from core.atlassian.auth.strategies import AuthStrategy
-from core.db.models import Repository, RepoStatus, SyncStatus
-from core.db.repositories import RepositoryReadWrite
+from core.atlassian.cache import ResponseCache, TTLCache
+from core.atlassian.clients import registry
+from core.atlassian.object_store import object_store
+from core.db.models import CloneStrategy, Repository, RepoStatus, SyncStatus
+from core.db.repositories import CommitReadWrite, RepositoryReadWrite
 from core.db.unit_of_work import UnitOfWork
+from core.db.write_behind import SyncStatusBuffer
 from core.settings import setting
 
+provider_info_cache = TTLCache(ttl=setting.PROVIDER_INFO_TTL)
+response_cache = ResponseCache(
+    ttl=setting.HTTP_CACHE_TTL,
+    maxsize=setting.HTTP_CACHE_MAXSIZE,
+    max_bytes=setting.HTTP_CACHE_MAX_BYTES,
+)
+
 
 class AtlassianClientBase:
-    def __init__(self, base_url: HttpUrl, credentials: AuthStrategy):
-        self.base_url = base_url
+    def __init__(self, base_url: HttpUrl, credentials: Optional[AuthStrategy]):
+        # HttpUrl of a bare host ends with a slash, the paths are appended to it.
+        self.base_url = str(base_url).rstrip("/")
         self.credentials = credentials
         self._headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
-            **self.credentials.get_headers(),
+            **(self.credentials.get_headers() if self.credentials else {}),
         }
 
     @property
     def headers(self):
         return self._headers.copy()
 
+    async def get(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        max_age: Optional[float] = None,
+        cache: bool = True,
+    ) -> httpx.Response:
+        """
+        GET through the shared response cache, see ResponseCache.get for max_age.
+        With cache=False the request bypasses the cache and the response is not stored.
+        """
+        client = registry.get(self.base_url)
+
+        if not setting.HTTP_CACHE or not cache:
+            return await client.get(url, params=params, headers=self.headers)
+
+        return await response_cache.get(client, url, params=params, headers=self.headers, max_age=max_age)
+
     @staticmethod
     def extract_error(data: dict) -> str:
         if not isinstance(data, dict):
@@ -59,42 +93,238 @@ class BitbucketRepositoryClient(AtlassianClientBase):
         self.repository = repository
         self.branch = branch
 
-    async def fetch_commits(self, limit: int = 1) -> requests.Response:
+    async def fetch_commits(self, limit: int = 1, start: int = 0, cache: bool = True) -> httpx.Response:
         url = f"{self.base_url}/rest/api/1.0/projects/{self.workspace}/repos/{self.repository}/commits"
         params = {"until": f"refs/heads/{self.branch}", "limit": limit}
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params, headers=self.headers)
-            return response
+        if start:
+            params["start"] = start
 
-        return None
+        response = await self.get(url, params=params, cache=cache)
+        return response
 
-    async def fetch_latest_commit(self) -> requests.Response:
-        response = await self.get_repository_commits(limit=1)
+    async def fetch_latest_commit(self) -> httpx.Response:
+        response = await self.fetch_commits(limit=1)
         return response
 
+    async def iter_commits(self, page_size: int = 100, max_commits: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Yields the commits of the branch page by page until isLastPage.
+        The next page is requested while the current one is being consumed, only two pages are held in memory.
+        Raises httpx.HTTPStatusError if Bitbucket rejects a page.
+        The pages are read once, they bypass the response cache so they do not evict the hot entries.
+        """
+        async def load(start: int) -> dict:
+            response = await self.fetch_commits(limit=page_size, start=start, cache=False)
+            response.raise_for_status()
+            return response.json()
+
+        pending = asyncio.create_task(load(0))
+        returned = 0
+
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+
+                if not page.get("isLastPage", True) and page.get("nextPageStart") is not None:
+                    if max_commits is None or returned + len(page.get("values", [])) < max_commits:
+                        pending = asyncio.create_task(load(page["nextPageStart"]))
+
+                for commit in page.get("values", []):
+                    if max_commits is not None and returned >= max_commits:
+                        return
+
+                    yield commit
+                    returned += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+
     @staticmethod
     def provider_info(base_url) -> dict:
-        url = f"{base_url}/rest/api/1.0/application-properties"
-        response = requests.get(url, timeout=10.0)
-        data = response.json()
+        base_url = str(base_url).rstrip("/")
+
+        def load() -> dict:
+            url = f"{base_url}/rest/api/1.0/application-properties"
+            response = registry.session.get(url, timeout=setting.HTTP_TIMEOUT)
+            response.raise_for_status()
+            return BitbucketRepositoryClient._provider_data(response.json())
+
+        return dict(provider_info_cache.get_or_load(base_url, load))
 
+    @staticmethod
+    async def provider_info_async(base_url) -> dict:
+        base_url = str(base_url).rstrip("/")
+
+        async def load() -> dict:
+            url = f"{base_url}/rest/api/1.0/application-properties"
+            response = await registry.get(base_url).get(url)
+            response.raise_for_status()
+            return BitbucketRepositoryClient._provider_data(response.json())
+
+        return dict(await provider_info_cache.aget_or_load(base_url, load))
+
+    @staticmethod
+    def _provider_data(data: dict) -> dict:
         provider_name = data.get("displayName", "Unknown name")
         provider_name += " Server"
         provider_version = data.get("version", "")
         data["provider"] = f"{provider_name} {provider_version}"
         return data
 
+    @staticmethod
+    def parse_clone_url(clone_url: str) -> Optional[Tuple[str, str]]:
+        """
+        Extracts the project key and the repository slug from a Bitbucket Server clone url:
+        https://host[/context]/scm/{project}/{repo}.git or ssh://git@host:port/{project}/{repo}.git
+        """
+        parts = [part for part in urlparse(clone_url).path.split("/") if part]
+
+        if "scm" in parts:
+            parts = parts[parts.index("scm") + 1 :]
+
+        if len(parts) < 2:
+            return None
+
+        workspace, repository = parts[-2], parts[-1]
+        return workspace, repository.removesuffix(".git")
+
+
+class BitbucketHostProbe(AtlassianClientBase):
+    """
+    Fetches the latest commit of many repository branches on one Bitbucket host in a single sweep.
+    """
+
+    def __init__(self, base_url: HttpUrl, credentials: Optional[AuthStrategy], concurrency: int = 16):
+        super().__init__(base_url=base_url, credentials=credentials)
+        self.concurrency = concurrency
+
+    async def latest_commits(
+        self, targets: Iterable[Tuple[str, str, str]]
+    ) -> Dict[Tuple[str, str, str], Optional[str]]:
+        """
+        Accepts (workspace, repository, branch) triples and returns the head commit of each one.
+        The requests share the pooled client of the host and run concurrently, a failed lookup yields None.
+        """
+        targets = list(dict.fromkeys(targets))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def latest(workspace: str, repository: str, branch: str) -> Optional[str]:
+            url = f"{self.base_url}/rest/api/1.0/projects/{workspace}/repos/{repository}/commits"
+            params = {"until": f"refs/heads/{branch}", "limit": 1}
+
+            async with semaphore:
+                try:
+                    # Always revalidated: the sweep needs the current head, but a 304 is still cheaper.
+                    response = await self.get(url, params=params, max_age=0)
+                except httpx.HTTPError:
+                    return None
+
+            if response.status_code != 200:
+                return None
+
+            values = response.json().get("values") or []
+            return values[0].get("id") if values else None
+
+        heads = await asyncio.gather(*(latest(*target) for target in targets))
+        return dict(zip(targets, heads))
+
+
+class GitProgress(RemoteProgress):
+    """
+    Forwards the progress of git operations to a callback,
+    at most once per interval and on every phase change.
+    """
+
+    PHASES = {
+        RemoteProgress.COUNTING: "counting",
+        RemoteProgress.COMPRESSING: "compressing",
+        RemoteProgress.WRITING: "writing",
+        RemoteProgress.RECEIVING: "receiving",
+        RemoteProgress.RESOLVING: "resolving",
+        RemoteProgress.FINDING_SOURCES: "finding sources",
+        RemoteProgress.CHECKING_OUT: "checking out",
+    }
+    UNITS = {"B": 1, "KiB": 1024, "MiB": 1024**2, "GiB": 1024**3, "TiB": 1024**4}
+    TRANSFER = re.compile(r"([\d.]+) ([KMGT]?i?B)(?: \| ([\d.]+) ([KMGT]?i?B)/s)?")
+
+    def __init__(self, callback: Callable[..., None], interval: float = 0.5):
+        super().__init__()
+        self.callback = callback
+        self.interval = interval
+        self._phase: Optional[str] = None
+        self._reported_at = 0.0
+
+    def update(self, op_code: int, cur_count, max_count=None, message: str = "") -> None:
+        phase = self.PHASES.get(op_code & self.OP_MASK, "unknown")
+        now = time.monotonic()
+
+        if phase == self._phase and not op_code & self.END and now - self._reported_at < self.interval:
+            return
+
+        self._phase = phase
+        self._reported_at = now
+
+        current = int(cur_count or 0)
+        total = int(max_count) if max_count else None
+        progress = {
+            "phase": phase,
+            "current": current,
+            "total": total,
+            "percent": round(current * 100 / total, 1) if total else None,
+            "message": (message or "").strip(),
+        }
+
+        transfer = self.TRANSFER.search(progress["message"])
+
+        if transfer:
+            size, unit, rate, rate_unit = transfer.groups()
+            progress["bytes"] = int(float(size) * self.UNITS.get(unit, 1))
+
+            if rate:
+                progress["throughput"] = int(float(rate) * self.UNITS.get(rate_unit, 1))
+
+        self.callback(**progress)
+
 
 class RepositoryGitClient:
-    def __init__(self, folder: str, credentials: Optional[Tuple[Optional[str], Optional[str]]] = None):
+    def __init__(
+        self,
+        folder: str,
+        credentials: Optional[Tuple[Optional[str], Optional[str]]] = None,
+        repository_id: Optional[str] = None,
+        status_buffer: Optional[SyncStatusBuffer] = None,
+    ):
         self.folder = folder
         self.credentials = credentials
         self.path = Path(setting.REPOSITORIES_STORAGE) / self.folder
         self.repository: Optional[Repo] = None
+        self.repository_id = repository_id
+        self.status_buffer = status_buffer
         self.uow = UnitOfWork()
-
-    def clone(self, url: str, branch: str = "main") -> Repo:
+        self.pulled_commits = 0
+
+    CLONE_OPTIONS = {
+        CloneStrategy.shallow: {"depth": 1},
+        CloneStrategy.full: {},
+        CloneStrategy.blobless: {"filter": "blob:none"},
+        CloneStrategy.treeless: {"filter": "tree:0"},
+        CloneStrategy.sparse: {"filter": "blob:none", "sparse": True},
+    }
+    # Partial clones fetch missing objects lazily from their promisor remote and are not linked to the cache.
+    SHARED_STRATEGIES = (CloneStrategy.shallow, CloneStrategy.full)
+
+    def clone(
+        self,
+        url: str,
+        branch: str = "main",
+        progress: Optional[Callable[..., None]] = None,
+        strategy: CloneStrategy = CloneStrategy.shallow,
+        sparse_paths: Optional[List[str]] = None,
+        tracked_refs: Optional[List[str]] = None,
+    ) -> Repo:
         if self.path.exists():
             raise FileExistsError("A repository with that name already exists.")
 
@@ -105,8 +335,15 @@ class RepositoryGitClient:
 
         try:
             base_url = self._compute_base_url(url, filter_path=["bitbucket"])
-            provider_data = BitbucketRepositoryClient.provider_info(base_url)
-            provider_name = provider_data.get("provider", "Unknown")
+
+            if urlparse(url).scheme == "file":
+                # Local remotes (mirrors, benchmarks) have no REST API to ask.
+                provider_name = "Local"
+            else:
+                with tracing.span("http.provider_info", base_url=base_url):
+                    provider_data = BitbucketRepositoryClient.provider_info(base_url)
+
+                provider_name = provider_data.get("provider", "Unknown")
         except Exception as e:
             raise Exception(f"Error getting basic repository information: {e}")
 
@@ -115,22 +352,38 @@ class RepositoryGitClient:
         if self._needs_authentication(url):
             clone_url = self._create_authenticated_url(url)
 
+        if strategy == CloneStrategy.sparse and not sparse_paths:
+            raise ValueError("The sparse clone strategy requires at least one path.")
+
+        options = self.CLONE_OPTIONS[strategy]
+
         try:
-            self.repository = Repo.clone_from(
-                url=clone_url,
-                to_path=self.path,
-                branch=branch,
-                single_branch=True,
-                depth=1,
-            )
+            if object_store is not None and strategy in self.SHARED_STRATEGIES:
+                # The objects are borrowed from the local cache, so there is nothing to gain from a shallow history.
+                with tracing.span("git.object_store.fetch", branch=branch):
+                    options = {"reference": str(object_store.fetch(url, clone_url, branch))}
+
+            with tracing.span("git.clone", repository=self.folder, branch=branch, strategy=strategy.value):
+                self.repository = Repo.clone_from(
+                    url=clone_url,
+                    to_path=self.path,
+                    branch=branch,
+                    single_branch=True,
+                    progress=GitProgress(progress) if progress else None,
+                    **options,
+                )
 
             if not self.repository:
                 raise Exception("Cloning the repository returned nothing")
 
             try:
+                if strategy == CloneStrategy.sparse:
+                    self.apply_sparse_paths(sparse_paths)
+
                 commit = self.repository.head.commit
+                commits = self.commit_rows(branch, None, commit.hexsha)
 
-                with self.uow.start() as session:
+                with tracing.span("db.repository.add", commits=len(commits)), self.uow.start() as session:
                     db = RepositoryReadWrite(session)
                     db_repository = Repository(
                         name=self.folder,
@@ -139,12 +392,21 @@ class RepositoryGitClient:
                         clone_url=url,
                         description=version.__version__,
                         branch=branch,
+                        clone_strategy=strategy,
+                        sparse_paths=list(sparse_paths or []),
+                        tracked_refs=list(tracked_refs or []),
                         last_commit_hash=commit.hexsha,
                         last_commit_message=commit.message.strip(),
                         last_commit_author=str(commit.author),
                         last_commit_timestamp=commit.authored_datetime.isoformat(),
                     )
                     db.add(db_repository)
+                    session.flush()
+
+                    for row in commits:
+                        row["repository_id"] = db_repository.id
+
+                    CommitReadWrite(session).add_many(commits)
             except Exception:
                 self.delete()
                 raise
@@ -155,48 +417,57 @@ class RepositoryGitClient:
         except Exception as e:
             raise Exception(f"Unexpected clone error: {e}")
 
-    def pull(self, clone_url: Optional[str] = None) -> IterableList[FetchInfo]:
+    def pull(
+        self,
+        clone_url: Optional[str] = None,
+        progress: Optional[Callable[..., None]] = None,
+    ) -> IterableList[FetchInfo]:
         if not self.path.exists():
             raise FileNotFoundError("The repository was not found.")
 
         self.repository_load()
 
-        with self.uow.start() as session:
-            db = RepositoryReadWrite(session)
-            db_repository = db.get_by_name(self.folder)
-
-            time_now = datetime.now(timezone.utc)
-
-            db_repository.last_sync_status = SyncStatus.failed
-            db_repository.last_sync_at = time_now
-            db_repository.sync_count = (db_repository.sync_count or 0) + 1
-
-            try:
-                origin = self.repository.remotes.origin
-
-                if clone_url and self._needs_authentication(clone_url):
-                    origin.set_url(self._create_authenticated_url(clone_url))
-
-                list_info = origin.pull()
-
-                db_repository.last_sync_status = SyncStatus.success
-                db_repository.last_successful_sync_at = time_now
-
-                commit = self.repository.head.commit
-                db_repository.last_commit_hash = commit.hexsha
-                db_repository.last_commit_message = commit.message.strip()
-                db_repository.last_commit_author = str(commit.author)
-                db_repository.last_commit_timestamp = commit.authored_datetime.isoformat()
-                db_repository.total_commits_synced = (db_repository.total_commits_synced or 0) + 1
-                return list_info
-            except GitCommandError as e:
-                db_repository.failed_sync_count = (db_repository.failed_sync_count or 0) + 1
-                raise Exception(f"Git pull failed: {e}")
-            except Exception as e:
-                db_repository.failed_sync_count = (db_repository.failed_sync_count or 0) + 1
-                raise Exception(f"Unexpected pull error: {e}")
+        time_now = datetime.now(timezone.utc)
+        values = {"last_sync_status": SyncStatus.failed, "last_sync_at": time_now}
+        increments = {"sync_count": 1}
 
-        return None
+        try:
+            origin = self.repository.remotes.origin
+
+            if clone_url and self._needs_authentication(clone_url):
+                origin.set_url(self._create_authenticated_url(clone_url))
+
+            if object_store is not None and object_store.uses(self.repository):
+                with tracing.span("git.object_store.fetch", branch=self.repository.active_branch.name):
+                    object_store.fetch(clone_url or origin.url, origin.url, self.repository.active_branch.name)
+
+            previous = self.repository.head.commit.hexsha
+
+            with tracing.span("git.pull", repository=self.folder) as span:
+                list_info = origin.pull(progress=GitProgress(progress) if progress else None)
+                span.set(refs=len(list_info))
+
+            commit = self.repository.head.commit
+            commits = self.commit_rows(self.repository.active_branch.name, previous, commit.hexsha)
+            values.update(
+                last_sync_status=SyncStatus.success,
+                last_successful_sync_at=time_now,
+                last_commit_hash=commit.hexsha,
+                last_commit_message=commit.message.strip(),
+                last_commit_author=str(commit.author),
+                last_commit_timestamp=commit.authored_datetime,
+            )
+            increments["total_commits_synced"] = self.pulled_commits = len(commits)
+            self.save_commits(commits)
+            return list_info
+        except GitCommandError as e:
+            increments["failed_sync_count"] = 1
+            raise Exception(f"Git pull failed: {e}")
+        except Exception as e:
+            increments["failed_sync_count"] = 1
+            raise Exception(f"Unexpected pull error: {e}")
+        finally:
+            self._save_status(values, increments)
 
     def delete(self):
         if not self.path.exists():
@@ -224,27 +495,198 @@ class RepositoryGitClient:
         except Exception as e:
             raise RuntimeError(f"Unexpected error during repository deletion: {e}")
 
-    def relevance(self) -> bool:
+    def relevance(self, known_commit: Optional[str] = None, probe: Optional[bool] = None) -> bool:
         if not self.path.exists():
             raise FileNotFoundError("The repository was not found.")
 
+        if probe is None:
+            probe = setting.GIT_RELEVANCE_PROBE
+
         self.repository_load()
 
-        commit = self.repository.head.commit
+        branch_name = self.repository.active_branch.name
+        commit = known_commit or self.repository.head.commit.hexsha
+
+        if probe:
+            remote_commit = self.remote_head(branch_name)
+
+            if remote_commit is not None:
+                return commit == remote_commit
 
         origin = self.repository.remotes.origin
-        origin.fetch()
 
-        branch_name = self.repository.active_branch.name
+        with tracing.span("git.fetch", repository=self.folder, branch=branch_name):
+            origin.fetch()
+
         remote_commit = origin.refs[branch_name].commit
-        return commit.hexsha == remote_commit.hexsha
+        return commit == remote_commit.hexsha
+
+    def remote_head(self, branch: str) -> Optional[str]:
+        """
+        Asks the remote for the current commit of the branch (ls-remote)
+        without downloading any objects. Returns None if the branch is not advertised.
+        """
+        self.repository_load()
+
+        ref = f"refs/heads/{branch}"
+
+        with tracing.span("git.ls_remote", repository=self.folder, ref=ref):
+            output = self.repository.git.ls_remote("origin", ref)
+
+        for line in output.splitlines():
+            hexsha, _, name = line.partition("\t")
+
+            if name == ref:
+                return hexsha
+
+        return None
+
+    def remote_heads(self) -> Dict[str, str]:
+        """
+        Returns the current commit of every branch of the remote with a single ls-remote.
+        """
+        self.repository_load()
+
+        heads = {}
+
+        with tracing.span("git.ls_remote", repository=self.folder, ref="refs/heads/*"):
+            output = self.repository.git.ls_remote("--heads", "origin")
+
+        for line in output.splitlines():
+            hexsha, _, ref = line.partition("\t")
+            heads[ref.removeprefix("refs/heads/")] = hexsha
+
+        return heads
+
+    def fetch_branches(self, branches: Iterable[str]) -> None:
+        """
+        Updates the remote-tracking refs of several branches with one fetch.
+        Clones are single-branch, so the refspecs are given explicitly.
+        """
+        self.repository_load()
+
+        refspecs = [f"+refs/heads/{branch}:refs/remotes/origin/{branch}" for branch in branches]
+
+        if not refspecs:
+            return
+
+        options = ["--no-tags"]
+
+        if self.repository.git.rev_parse("--is-shallow-repository") == "true":
+            options.append("--depth=1")
+
+        with tracing.span("git.fetch", repository=self.folder, branches=len(refspecs)):
+            self.repository.git.fetch(*options, "origin", *refspecs)
+
+    @staticmethod
+    def tracked_branches(heads: Dict[str, str], branch: str, patterns: Iterable[str]) -> Dict[str, str]:
+        """
+        Keeps the heads of the main branch and of the branches matching one of the patterns (fnmatch syntax).
+        """
+        patterns = list(patterns)
+
+        return {
+            name: hexsha
+            for name, hexsha in heads.items()
+            if name == branch or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+        }
+
+    def commit_rows(self, branch: str, since: Optional[str], until: str) -> List[Dict[str, Any]]:
+        """
+        Rows for the commit index: the commits from since (exclusive) to until.
+        Without a usable since, e.g. right after cloning, the newest COMMIT_INDEX_LIMIT commits are taken.
+        """
+        self.repository_load()
+
+        if since == until:
+            return []
+
+        revision = until
+
+        if since:
+            try:
+                self.repository.git.cat_file("-e", f"{since}^{{commit}}")
+                revision = f"{since}..{until}"
+            except GitCommandError:
+                pass
+
+        with tracing.span("git.log", repository=self.folder, revision=revision) as span:
+            rows = [
+                {
+                    "repository_id": self.repository_id,
+                    "branch": branch,
+                    "hash": commit.hexsha,
+                    "message": commit.message.strip(),
+                    "author_name": commit.author.name,
+                    "author_email": commit.author.email,
+                    "authored_at": commit.authored_datetime,
+                    "committed_at": commit.committed_datetime,
+                }
+                for commit in self.repository.iter_commits(revision, max_count=setting.COMMIT_INDEX_LIMIT)
+            ]
+            span.set(commits=len(rows))
+
+        return rows
+
+    def save_commits(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+
+        if self.status_buffer is not None and self.repository_id:
+            self.status_buffer.record_commits(rows)
+            return
+
+        with tracing.span("db.commits.add", repository=self.folder, commits=len(rows)), self.uow.start() as session:
+            db_repository = RepositoryReadWrite(session).get_by_name(self.folder)
+
+            for row in rows:
+                row["repository_id"] = db_repository.id
+
+            CommitReadWrite(session).add_many(rows)
+
+    def _save_status(self, values: Dict[str, Any], increments: Dict[str, int]):
+        """
+        Writes the synchronization status to the write-behind buffer if there is one, otherwise to the database.
+        """
+        if self.status_buffer is not None and self.repository_id:
+            self.status_buffer.record(self.repository_id, increments, **values)
+            return
+
+        with tracing.span("db.status", repository=self.folder), self.uow.start() as session:
+            db = RepositoryReadWrite(session)
+            db_repository = db.get_by_name(self.folder)
+
+            for name, value in values.items():
+                setattr(db_repository, name, value)
+
+            for name, value in increments.items():
+                setattr(db_repository, name, (getattr(db_repository, name) or 0) + value)
+
+    def apply_sparse_paths(self, paths: List[str]) -> None:
+        """
+        Limits the working tree to the given directories (cone mode), nothing is done if they are already set.
+        Later pulls keep both the sparse paths and the partial clone filter, git stores them in the repository config.
+        """
+        self.repository_load()
+
+        paths = sorted({path.strip("/") for path in paths if path.strip("/")})
+
+        try:
+            current = sorted(self.repository.git.sparse_checkout("list").splitlines())
+        except GitCommandError:
+            current = []
+
+        if current != paths:
+            self.repository.git.sparse_checkout("set", "--cone", *paths)
 
     def repository_load(self) -> Repo:
         if self.repository:
             return self.repository
 
         try:
-            self.repository = Repo(self.path)
+            with tracing.span("git.open", repository=self.folder):
+                self.repository = Repo(self.path)
+
             return self.repository
         except NoSuchPathError:
             raise Exception(f"The repository directory was not found at {self.path}")
@@ -1,8 +1,26 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
 
 from core.settings import setting
 
-engine = create_engine(url=setting.database_url, pool_pre_ping=True, future=True)
+engine = create_engine(
+    url=setting.database_url,
+    pool_pre_ping=True,
+    pool_size=setting.DATABASE_POOL_SIZE,
+    max_overflow=setting.DATABASE_MAX_OVERFLOW,
+    pool_timeout=setting.DATABASE_POOL_TIMEOUT,
+    future=True,
+)
 Session = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+
+async_engine = create_async_engine(
+    url=setting.async_database_url,
+    pool_pre_ping=True,
+    pool_size=setting.DATABASE_POOL_SIZE,
+    max_overflow=setting.DATABASE_MAX_OVERFLOW,
+    pool_timeout=setting.DATABASE_POOL_TIMEOUT,
+)
+AsyncSessionFactory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
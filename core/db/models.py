@@ -1,7 +1,22 @@
 import enum
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, Enum, Integer, String, Text, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 
 from core.db.base import Base
 
@@ -21,6 +36,14 @@ class SyncStatus(enum.Enum):
     skipped = "skipped"
 
 
+class CloneStrategy(enum.Enum):
+    shallow = "shallow"
+    full = "full"
+    blobless = "blobless"
+    treeless = "treeless"
+    sparse = "sparse"
+
+
 class Repository(Base):
     __tablename__ = "repositories"
 
@@ -35,6 +58,13 @@ class Repository(Base):
     description = Column(Text)
 
     branch = Column(String(255), nullable=False, server_default="main")
+    clone_strategy = Column(
+        Enum(CloneStrategy, native_enum=False, length=50, name="clone_strategy"),
+        nullable=False,
+        server_default=CloneStrategy.shallow.value,
+    )
+    sparse_paths = Column(JSON, nullable=False, server_default="[]")
+    tracked_refs = Column(JSON, nullable=False, server_default="[]")
     active = Column(Boolean, nullable=False, server_default="true")
     auto_sync = Column(Boolean, nullable=False, server_default="true")
     enable_polling = Column(Boolean, nullable=False, server_default="true")
@@ -44,6 +74,11 @@ class Repository(Base):
     max_retries = Column(Integer, nullable=False, server_default="3")
     retry_delay = Column(Integer, nullable=False, server_default="1000")
 
+    next_sync_at = Column(DateTime(timezone=True))
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime(timezone=True))
+    sync_failures = Column(Integer, nullable=False, server_default="0")
+
     last_sync_status = Column(
         Enum(SyncStatus, native_enum=True, name="sync_status"), nullable=False, server_default=SyncStatus.pending.value
     )
@@ -65,5 +100,100 @@ class Repository(Base):
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     deleted_at = Column(DateTime(timezone=True))
 
+    branches = relationship("RepositoryBranch", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # get_by_name: at most one active repository per name.
+        Index("uq_repositories_name_active", name, unique=True, postgresql_where=status == RepoStatus.active),
+        # get_for_pulling: due repositories in the order they are claimed.
+        Index(
+            "ix_repositories_due",
+            next_sync_at.asc().nullsfirst(),
+            lease_expires_at,
+            postgresql_where=(status == RepoStatus.active) & active.is_(True) & auto_sync.is_(True),
+        ),
+        # get_for_sync: the repositories that start_all schedules.
+        Index(
+            "ix_repositories_sync",
+            id,
+            postgresql_where=(status == RepoStatus.active)
+            & active.is_(True)
+            & enable_polling.is_(True)
+            & auto_sync.is_(True),
+        ),
+    )
+
     def __repr__(self):
         return f"<Repository {self.provider} ({self.status})>"
+
+
+class RepositoryBranch(Base):
+    __tablename__ = "repository_branches"
+    __table_args__ = (UniqueConstraint("repository_id", "name", name="uq_repository_branches_repository_id_name"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    repository_id = Column(UUID(as_uuid=True), ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(255), nullable=False)
+
+    last_commit_hash = Column(String(128))
+    last_changed_at = Column(DateTime(timezone=True))
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<RepositoryBranch {self.name} ({self.last_commit_hash})>"
+
+
+class Commit(Base):
+    __tablename__ = "commits"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    repository_id = Column(UUID(as_uuid=True), ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
+    branch = Column(String(255), nullable=False)
+    hash = Column(String(128), nullable=False)
+
+    message = Column(Text)
+    author_name = Column(String(255))
+    author_email = Column(String(255))
+    authored_at = Column(DateTime(timezone=True))
+    committed_at = Column(DateTime(timezone=True), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("repository_id", "branch", "hash", name="uq_commits_repository_id_branch_hash"),
+        Index("ix_commits_repository_id_branch_committed_at", repository_id, branch, committed_at.desc(), hash.desc()),
+        Index("ix_commits_committed_at", committed_at),
+    )
+
+    def __repr__(self):
+        return f"<Commit {self.hash} ({self.branch})>"
+
+
+class SyncRun(Base):
+    """
+    Append-only history of synchronizations, partitioned by month of started_at.
+    """
+
+    __tablename__ = "sync_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    started_at = Column(DateTime(timezone=True), primary_key=True)
+    repository_id = Column(UUID(as_uuid=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Integer, nullable=False)
+    status = Column(Enum(SyncStatus, native_enum=False, length=50, name="sync_run_status"), nullable=False)
+    triggered = Column(Boolean, nullable=False, server_default="false")
+    commits = Column(Integer, nullable=False, server_default="0")
+    bytes_fetched = Column(BigInteger)
+    error = Column(Text)
+    instance = Column(String(255))
+
+    __table_args__ = (
+        Index("ix_sync_runs_repository_id_started_at", repository_id, started_at),
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
+
+    def __repr__(self):
+        return f"<SyncRun {self.repository_id} ({self.status})>"
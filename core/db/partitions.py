@@ -0,0 +1,120 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from core.db.unit_of_work import AsyncUnitOfWork
+
+
+def _month(day: date, offset: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _utc(day: date) -> str:
+    """
+    A timestamptz literal for the start of the day in UTC; a bare date would be read in the session time zone.
+    """
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+class MonthlyPartitions:
+    """
+    Maintains the monthly range partitions of a table partitioned by a timestamp column.
+    Partitions are named <table>_yYYYYmMM, e.g. sync_runs_y2026m10, the default partition <table>_default.
+    """
+
+    def __init__(self, table: str, column: str, uow: Optional[AsyncUnitOfWork] = None):
+        self.table = table
+        self.column = column
+        self.default = f"{table}_default"
+        self.uow = uow or AsyncUnitOfWork()
+        self._name = re.compile(rf"^{re.escape(table)}_y(\d{{4}})m(\d{{2}})$")
+
+    def name(self, month: date) -> str:
+        return f"{self.table}_y{month:%Y}m{month:%m}"
+
+    async def maintain(self, months_ahead: int, retention_days: int) -> Optional[List[str]]:
+        """
+        Creates the partitions up to months_ahead and drops the ones that ended before the retention window,
+        expired rows of the default partition are deleted as well.
+        Returns the dropped partitions, or None if another instance holds the maintenance lock.
+        """
+        # The month bounds follow the UTC timestamps of the rows, not the local time of the server.
+        today = datetime.now(timezone.utc).date()
+        cutoff = today - timedelta(days=retention_days)
+        dropped = []
+
+        async with self.uow.start() as session:
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"), {"name": f"{self.table}_partitions"}
+            )
+
+            if not locked.scalar():
+                return None
+
+            partitions = await self._partitions(session)
+
+            for offset in range(months_ahead + 1):
+                lower, upper = _month(today, offset), _month(today, offset + 1)
+
+                if self.name(lower) not in partitions:
+                    await self._create(session, lower, upper, self.default in partitions)
+
+            for partition in partitions:
+                match = self._name.match(partition)
+
+                if not match:
+                    continue
+
+                upper = _month(date(int(match.group(1)), int(match.group(2)), 1), 1)
+
+                if upper <= cutoff:
+                    await session.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+                    dropped.append(partition)
+
+            if self.default in partitions:
+                await session.execute(text(f"DELETE FROM {self.default} WHERE {self.column} < {_utc(_month(cutoff))}"))
+
+        return dropped
+
+    async def _create(self, session, lower: date, upper: date, has_default: bool) -> None:
+        """
+        Creates the partition of the month. Rows of the month that landed in the default partition would make
+        the creation fail, so they are moved out first and inserted again once the partition exists.
+        """
+        bounds = f"{self.column} >= {_utc(lower)} AND {self.column} < {_utc(upper)}"
+        stragglers = f"{self.name(lower)}_stragglers"
+
+        if has_default:
+            await session.execute(text(f"CREATE TEMPORARY TABLE {stragglers} (LIKE {self.table}) ON COMMIT DROP"))
+            await session.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {self.default} WHERE {bounds} RETURNING *) "
+                    f"INSERT INTO {stragglers} SELECT * FROM moved"
+                )
+            )
+
+        await session.execute(
+            text(
+                f"CREATE TABLE {self.name(lower)} PARTITION OF {self.table} "
+                f"FOR VALUES FROM ({_utc(lower)}) TO ({_utc(upper)})"
+            )
+        )
+
+        if has_default:
+            await session.execute(text(f"INSERT INTO {self.table} SELECT * FROM {stragglers}"))
+            await session.execute(text(f"DROP TABLE {stragglers}"))
+
+    async def _partitions(self, session) -> List[str]:
+        result = await session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {"table": self.table},
+        )
+        return list(result.scalars().all())
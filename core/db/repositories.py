@@ -1,9 +1,13 @@
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
+from sqlalchemy import BigInteger, Float, and_, cast, func, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
-from core.db.models import Repository, RepoStatus
+from core.db.models import Commit, Repository, RepoStatus, SyncRun, SyncStatus
 
 
 class RepositoryReadWrite:
@@ -34,6 +38,15 @@ class RepositoryReadWrite:
         )
         return self.session.execute(statement).scalars().first()
 
+    def get_by_ids(self, repository_ids: List[str]) -> List[Repository]:
+        """
+        Returns the repositories with the given IDs in a single query.
+        """
+        statement = select(Repository).where(
+            Repository.id.in_(repository_ids),
+        )
+        return list(self.session.execute(statement).scalars().all())
+
     def get_by_name(self, repository_name: str) -> Optional[Repository]:
         """
         Returns the repository by Name or None if not found.
@@ -44,15 +57,329 @@ class RepositoryReadWrite:
         )
         return self.session.execute(statement).scalars().first()
 
-    def get_for_pulling(self, limit: int = 100) -> List[Repository]:
+    def get_for_pulling(self, owner: str, limit: int = 100, lease: float = 60.0) -> List[Repository]:
+        """
+        Claims up to limit due repositories for the owner until the lease expires.
+        Rows claimed by other instances are skipped, expired leases are taken over.
+        """
+        return list(self.session.execute(_claim(owner, limit, lease)).scalars().all())
+
+    def get_for_sync(self) -> List[Repository]:
+        """
+        Retrieves all repositories set up for automatic synchronization.
+        """
+        statement = select(Repository).where(
+            Repository.status == RepoStatus.active,
+            Repository.active.is_(True),
+            Repository.enable_polling.is_(True),
+            Repository.auto_sync.is_(True),
+        )
+        return list(self.session.execute(statement).scalars().all())
+
+
+class AsyncRepositoryReadWrite:
+    """
+    Asynchronous Data Access Layer for the Repository model.
+    """
+
+    def __init__(self, session: AsyncSession):
+        """
+        Initializing the repository with the SQLAlchemy async session.
+        The session is created in AsyncUnitOfWork and transferred here.
+        """
+        self.session: AsyncSession = session
+
+    def add(self, repository: Repository) -> None:
+        """
+        Adds a new Repository object to the current session.
+        The commit will only occur when AsyncUnitOfWork is called.
+        """
+        self.session.add(repository)
+
+    async def get_by_id(self, repository_id: str, with_branches: bool = False) -> Optional[Repository]:
+        """
+        Returns the repository by ID or None if not found.
+        Tracked branches are only available with with_branches, lazy loading does not work in async sessions.
+        """
+        statement = select(Repository).where(
+            Repository.id == repository_id,
+        )
+
+        if with_branches:
+            statement = statement.options(selectinload(Repository.branches))
+
+        return (await self.session.execute(statement)).scalars().first()
+
+    async def get_by_ids(self, repository_ids: List[str], with_branches: bool = False) -> List[Repository]:
+        """
+        Returns the repositories with the given IDs in a single query.
+        """
+        statement = select(Repository).where(
+            Repository.id.in_(repository_ids),
+        )
+
+        if with_branches:
+            statement = statement.options(selectinload(Repository.branches))
+
+        return list((await self.session.execute(statement)).scalars().all())
+
+    async def get_by_name(self, repository_name: str) -> Optional[Repository]:
+        """
+        Returns the repository by Name or None if not found.
+        """
+        statement = select(Repository).where(
+            Repository.name == repository_name,
+            Repository.status == RepoStatus.active,
+        )
+        return (await self.session.execute(statement)).scalars().first()
+
+    async def get_for_pulling(self, owner: str, limit: int = 100, lease: float = 60.0) -> List[Repository]:
+        """
+        Claims up to limit due repositories for the owner until the lease expires.
+        Rows claimed by other instances are skipped, expired leases are taken over.
+        """
+        return list((await self.session.execute(_claim(owner, limit, lease))).scalars().all())
+
+    async def renew_leases(self, owner: str, repository_ids: List[str], lease: float = 60.0) -> List[str]:
         """
-        Retrieves the list of active repositories to be polled.
+        Extends the leases the owner still holds and returns their IDs.
         """
         statement = (
-            select(Repository)
-            .where(Repository.active.is_(True))
-            .where(Repository.enable_polling.is_(True))
-            .order_by(Repository.last_sync_at.asc().nullsfirst())
+            update(Repository)
+            .where(Repository.id.in_(repository_ids), Repository.lease_owner == owner)
+            .values(lease_expires_at=func.now() + timedelta(seconds=lease))
+            .returning(Repository.id)
+            .execution_options(synchronize_session=False)
+        )
+        return [str(repository_id) for repository_id in (await self.session.execute(statement)).scalars().all()]
+
+    async def release(self, repository_id: str, owner: str, interval: Optional[float], failures: int = 0) -> None:
+        """
+        Gives the repository back to the queue, due again after the interval.
+        A synchronization requested in the meantime keeps its earlier due time.
+        Without an interval the repository is only due again when requested.
+        The consecutive failures are kept with the row, so the next claimer continues the backoff.
+        """
+        values = {"lease_owner": None, "lease_expires_at": None, "sync_failures": failures}
+
+        if interval is not None:
+            values["next_sync_at"] = func.coalesce(Repository.next_sync_at, func.now() + timedelta(seconds=interval))
+
+        statement = (
+            update(Repository)
+            .where(Repository.id == repository_id, Repository.lease_owner == owner)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(statement)
+
+    async def request_sync(self, repository_id: str) -> None:
+        """
+        Makes the repository due immediately for whichever instance claims it next.
+        """
+        statement = (
+            update(Repository)
+            .where(Repository.id == repository_id)
+            .values(next_sync_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(statement)
+
+    async def get_for_sync(self) -> List[Repository]:
+        """
+        Retrieves all repositories set up for automatic synchronization.
+        """
+        statement = select(Repository).where(
+            Repository.status == RepoStatus.active,
+            Repository.active.is_(True),
+            Repository.enable_polling.is_(True),
+            Repository.auto_sync.is_(True),
+        )
+        return list((await self.session.execute(statement)).scalars().all())
+
+    async def get_for_push(self, host: str, workspace: str, repository: str, branches: List[str]) -> List[Repository]:
+        """
+        Returns the webhook-enabled repositories cloned from the given
+        Bitbucket host, project and repository that track one of the branches.
+        Repositories with tracked ref patterns are returned as well, the caller matches the patterns.
+        """
+        statement = select(Repository).where(
+            Repository.status == RepoStatus.active,
+            Repository.active.is_(True),
+            Repository.enable_webhooks.is_(True),
+            or_(Repository.branch.in_(branches), func.json_array_length(Repository.tracked_refs) > 0),
+            _hosted_on(host),
+            _cloned_from(workspace, repository),
+        )
+        return list((await self.session.execute(statement)).scalars().all())
+
+    async def get_by_remote(self, host: str, workspace: str, repository: str) -> List[Repository]:
+        """
+        Returns the active repositories cloned from the given Bitbucket host, project and repository.
+        """
+        statement = select(Repository).where(
+            Repository.status == RepoStatus.active,
+            Repository.active.is_(True),
+            _hosted_on(host),
+            _cloned_from(workspace, repository),
+        )
+        return list((await self.session.execute(statement)).scalars().all())
+
+
+def _due(limit: int):
+    """
+    The due repositories that no live lease holds, locked without waiting for other instances.
+    Webhook-only repositories are due only after a requested synchronization.
+    """
+    return (
+        select(Repository.id)
+        .where(
+            Repository.status == RepoStatus.active,
+            Repository.active.is_(True),
+            Repository.auto_sync.is_(True),
+            or_(
+                Repository.enable_polling.is_(True),
+                and_(Repository.enable_webhooks.is_(True), Repository.next_sync_at.is_not(None)),
+            ),
+            or_(Repository.next_sync_at.is_(None), Repository.next_sync_at <= func.now()),
+            or_(Repository.lease_expires_at.is_(None), Repository.lease_expires_at < func.now()),
+        )
+        .order_by(Repository.next_sync_at.asc().nullsfirst())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def _claim(owner: str, limit: int, lease: float):
+    """
+    UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING: concurrent instances never claim the same row.
+    """
+    return (
+        update(Repository)
+        .where(Repository.id.in_(_due(limit).scalar_subquery()))
+        .values(lease_owner=owner, lease_expires_at=func.now() + timedelta(seconds=lease), next_sync_at=None)
+        .returning(Repository)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _hosted_on(host: str):
+    """
+    The repositories whose Bitbucket API is served from the given host name, whatever the port.
+    """
+    authority = func.split_part(func.lower(Repository.api_url), "/", 3)
+    return func.split_part(authority, ":", 1) == host.lower()
+
+
+def _cloned_from(workspace: str, repository: str):
+    path = f"/{workspace}/{repository}.git".lower()
+    pattern = "%" + path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return func.lower(Repository.clone_url).like(pattern, escape="\\")
+
+
+def _insert_commits(rows: List[dict]):
+    """
+    Commits that are already indexed for the branch are left untouched.
+    """
+    return insert(Commit).values(rows).on_conflict_do_nothing(constraint="uq_commits_repository_id_branch_hash")
+
+
+class CommitReadWrite:
+    """
+    Data Access Layer for the Commit model.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, session: Session):
+        self.session: Session = session
+
+    def add_many(self, rows: List[dict]) -> None:
+        """
+        Inserts the commits in chunks, each chunk is a single multi-row INSERT.
+        """
+        for start in range(0, len(rows), self.CHUNK_SIZE):
+            self.session.execute(_insert_commits(rows[start : start + self.CHUNK_SIZE]))
+
+
+class AsyncCommitReadWrite:
+    """
+    Asynchronous Data Access Layer for the Commit model.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session: AsyncSession = session
+
+    async def add_many(self, rows: List[dict]) -> None:
+        """
+        Inserts the commits in chunks, each chunk is a single multi-row INSERT.
+        """
+        for start in range(0, len(rows), CommitReadWrite.CHUNK_SIZE):
+            await self.session.execute(_insert_commits(rows[start : start + CommitReadWrite.CHUNK_SIZE]))
+
+    async def get_page(
+        self,
+        repository_id: str,
+        branch: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Commit]:
+        """
+        Returns the newest commits of the branch, starting after the (committed_at, hash) key of the previous page.
+        Keyset pagination keeps every page an index range scan, however deep it is.
+        """
+        statement = (
+            select(Commit)
+            .where(Commit.repository_id == repository_id, Commit.branch == branch)
+            .order_by(Commit.committed_at.desc(), Commit.hash.desc())
             .limit(limit)
         )
-        return list(self.session.execute(statement).scalars().all())
+
+        if after is not None:
+            statement = statement.where(tuple_(Commit.committed_at, Commit.hash) < tuple_(*after))
+
+        return list((await self.session.execute(statement)).scalars().all())
+
+
+class AsyncSyncRunReadWrite:
+    """
+    Asynchronous Data Access Layer for the SyncRun model.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session: AsyncSession = session
+
+    async def add_many(self, rows: List[dict]) -> None:
+        """
+        Appends the runs in chunks, each chunk is a single multi-row INSERT.
+        """
+        for start in range(0, len(rows), CommitReadWrite.CHUNK_SIZE):
+            await self.session.execute(insert(SyncRun).values(rows[start : start + CommitReadWrite.CHUNK_SIZE]))
+
+    async def summary(self, since: datetime, limit: int = 20) -> List[dict]:
+        """
+        Aggregates the runs since the given moment per repository, the slowest (by p95 duration) first.
+        The filter on started_at limits the scan to the partitions of the window.
+        """
+        p95 = func.percentile_cont(0.95).within_group(SyncRun.duration_ms)
+        statement = (
+            select(
+                SyncRun.repository_id,
+                Repository.name,
+                func.count().label("runs"),
+                func.count().filter(SyncRun.status == SyncStatus.failed).label("failed"),
+                cast(func.avg(SyncRun.duration_ms), Float).label("avg_duration_ms"),
+                p95.label("p95_duration_ms"),
+                func.max(SyncRun.duration_ms).label("max_duration_ms"),
+                cast(func.sum(SyncRun.commits), BigInteger).label("commits"),
+                cast(func.sum(SyncRun.bytes_fetched), BigInteger).label("bytes_fetched"),
+                func.max(SyncRun.started_at).label("last_run_at"),
+            )
+            .join(Repository, Repository.id == SyncRun.repository_id, isouter=True)
+            .where(SyncRun.started_at >= since)
+            .group_by(SyncRun.repository_id, Repository.name)
+            .order_by(p95.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return [dict(row._mapping) for row in result]
@@ -1,6 +1,7 @@
-from contextlib import contextmanager
-from typing import Callable, Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Callable, Generator
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from core.db import base
@@ -34,3 +35,33 @@ class UnitOfWork:
             raise
         finally:
             session.close()
+
+
+class AsyncUnitOfWork:
+    """
+    The asynchronous counterpart of UnitOfWork.
+    Database round trips are awaited and never block the event loop.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = base.AsyncSessionFactory):
+        """
+        Accepts a factory that creates an AsyncSession
+        """
+        self.session_factory = session_factory
+
+    @asynccontextmanager
+    async def start(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        An async context manager that opens a session and
+        automatically commits or rolls back changes.
+        """
+        session = self.session_factory()
+
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
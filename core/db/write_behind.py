@@ -0,0 +1,244 @@
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from core import metrics, tracing
+from core.db.models import Repository, RepositoryBranch
+from core.db.repositories import AsyncCommitReadWrite, AsyncSyncRunReadWrite
+from core.db.unit_of_work import AsyncUnitOfWork
+
+STATUS_COLUMNS = (
+    "last_sync_status",
+    "last_sync_at",
+    "last_successful_sync_at",
+    "last_commit_hash",
+    "last_commit_message",
+    "last_commit_author",
+    "last_commit_timestamp",
+)
+STATUS_COUNTERS = ("sync_count", "failed_sync_count", "total_commits_synced")
+
+
+class SyncStatusBuffer:
+    """
+    Write-behind buffer for the synchronization status of repositories.
+    Changes are collected in memory and written periodically as one bulk UPDATE
+    instead of a separate transaction for every synchronization.
+    """
+
+    def __init__(self, uow: Optional[AsyncUnitOfWork] = None, interval: float = 2.0):
+        """
+        Records may come from worker threads, the flush runs on the event loop.
+        """
+        self.uow = uow or AsyncUnitOfWork()
+        self.interval = interval
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._increments: Dict[str, Counter] = {}
+        self._branches: Dict[Tuple[str, str], Tuple[Optional[str], datetime]] = {}
+        self._commits: List[Dict[str, Any]] = []
+        self._runs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, repository_id: str, increments: Optional[Dict[str, int]] = None, **values: Any) -> None:
+        """
+        Stores new column values and counter increments for the repository.
+        Later values overwrite earlier ones, increments are summed up until the next flush.
+        """
+        unknown = (set(values) - set(STATUS_COLUMNS)) | (set(increments or {}) - set(STATUS_COUNTERS))
+
+        if unknown:
+            raise ValueError(f"Columns cannot be buffered: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            self._values.setdefault(repository_id, {}).update(values)
+            self._increments.setdefault(repository_id, Counter()).update(increments or {})
+
+    def record_branches(self, repository_id: str, heads: Dict[str, Optional[str]]) -> None:
+        """
+        Stores the new heads of tracked branches, None marks a branch that was deleted on the remote.
+        """
+        changed_at = datetime.now(timezone.utc)
+
+        with self._lock:
+            for name, hexsha in heads.items():
+                self._branches[(repository_id, name)] = (hexsha, changed_at)
+
+    def record_commits(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Stores new rows for the commit index, they are inserted with the next flush.
+        """
+        with self._lock:
+            self._commits.extend(rows)
+
+    def record_run(self, run: Dict[str, Any]) -> None:
+        """
+        Stores a finished synchronization for the sync_runs history.
+        """
+        with self._lock:
+            self._runs.append(run)
+
+    def get(self, repository_id: str, column: str) -> Any:
+        """
+        Returns the value of the column that is waiting to be written, if any.
+        """
+        with self._lock:
+            return self._values.get(repository_id, {}).get(column)
+
+    async def flush(self, repository_id: Optional[str] = None) -> int:
+        """
+        Writes all buffered changes in a single statement, or only those of one repository.
+        Returns the number of updated repositories.
+        If the write fails the changes are merged back and retried with the next flush.
+        """
+        with self._lock:
+            if repository_id is None:
+                values, self._values = self._values, {}
+                increments, self._increments = self._increments, {}
+                branches, self._branches = self._branches, {}
+                commits, self._commits = self._commits, []
+                runs, self._runs = self._runs, []
+            else:
+                values, increments, branches, commits, runs = self._take(repository_id)
+
+        if not values and not increments and not branches and not commits and not runs:
+            return 0
+
+        table = Repository.__table__
+        columns = {
+            name: func.coalesce(bindparam(f"v_{name}", type_=table.c[name].type), table.c[name])
+            for name in STATUS_COLUMNS
+        }
+        counters = {name: table.c[name] + bindparam(f"i_{name}") for name in STATUS_COUNTERS}
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(**columns, **counters, updated_at=func.now())
+        )
+
+        rows = []
+
+        for repository_id in values.keys() | increments.keys():
+            row = {"b_id": repository_id}
+            row.update({f"v_{name}": values.get(repository_id, {}).get(name) for name in STATUS_COLUMNS})
+            row.update({f"i_{name}": increments.get(repository_id, Counter())[name] for name in STATUS_COUNTERS})
+            rows.append(row)
+
+        span = tracing.span("db.status_flush", rows=len(rows), commits=len(commits), runs=len(runs))
+
+        try:
+            with metrics.db_write_seconds.labels(operation="status_flush").time(), span:
+                async with self.uow.start() as session:
+                    if rows:
+                        await session.execute(statement, rows)
+
+                    await self._flush_branches(session, branches)
+                    await AsyncCommitReadWrite(session).add_many(commits)
+                    await AsyncSyncRunReadWrite(session).add_many(runs)
+        except Exception as e:
+            print(f"Failed to flush {len(rows)} repository statuses, they will be retried: {e}")
+            self._merge_back(values, increments, branches, commits, runs)
+            raise
+
+        return len(rows)
+
+    def _take(self, repository_id: str):
+        """
+        Removes the buffered changes of one repository and returns them. Called with the lock held.
+        """
+        values = {repository_id: self._values.pop(repository_id)} if repository_id in self._values else {}
+        increments = {repository_id: self._increments.pop(repository_id)} if repository_id in self._increments else {}
+        branches = {key: self._branches.pop(key) for key in [key for key in self._branches if key[0] == repository_id]}
+        commits = [row for row in self._commits if row["repository_id"] == repository_id]
+        runs = [run for run in self._runs if run["repository_id"] == repository_id]
+
+        if commits:
+            self._commits = [row for row in self._commits if row["repository_id"] != repository_id]
+
+        if runs:
+            self._runs = [run for run in self._runs if run["repository_id"] != repository_id]
+
+        return values, increments, branches, commits, runs
+
+    @staticmethod
+    async def _flush_branches(session, branches: Dict[Tuple[str, str], Tuple[Optional[str], datetime]]) -> None:
+        upserts = [
+            {"repository_id": repository_id, "name": name, "last_commit_hash": hexsha, "last_changed_at": changed_at}
+            for (repository_id, name), (hexsha, changed_at) in branches.items()
+            if hexsha is not None
+        ]
+        deleted = [key for key, (hexsha, _) in branches.items() if hexsha is None]
+
+        if upserts:
+            statement = insert(RepositoryBranch).values(upserts)
+            statement = statement.on_conflict_do_update(
+                index_elements=[RepositoryBranch.repository_id, RepositoryBranch.name],
+                set_={
+                    "last_commit_hash": statement.excluded.last_commit_hash,
+                    "last_changed_at": statement.excluded.last_changed_at,
+                    "updated_at": func.now(),
+                },
+            )
+            await session.execute(statement)
+
+        if deleted:
+            await session.execute(
+                delete(RepositoryBranch).where(
+                    tuple_(RepositoryBranch.repository_id, RepositoryBranch.name).in_(deleted)
+                )
+            )
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the periodic flush and writes everything that is still buffered.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    def _merge_back(
+        self,
+        values: Dict[str, Dict[str, Any]],
+        increments: Dict[str, Counter],
+        branches: Dict[Tuple[str, str], Tuple[Optional[str], datetime]],
+        commits: List[Dict[str, Any]],
+        runs: List[Dict[str, Any]],
+    ) -> None:
+        with self._lock:
+            self._commits[:0] = commits
+            self._runs[:0] = runs
+
+            for key, head in branches.items():
+                self._branches.setdefault(key, head)
+
+            for repository_id, older in values.items():
+                self._values[repository_id] = {**older, **self._values.get(repository_id, {})}
+
+            for repository_id, counter in increments.items():
+                self._increments.setdefault(repository_id, Counter()).update(counter)
+
+    def __len__(self) -> int:
+        with self._lock:
+            repositories = self._values.keys() | self._increments.keys() | {key[0] for key in self._branches}
+            return len(repositories | {row["repository_id"] for row in self._commits})
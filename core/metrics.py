@@ -0,0 +1,49 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# The metrics of the service are kept apart from the default registry of prometheus_client (process collectors).
+registry = CollectorRegistry()
+
+relevance_seconds = Histogram(
+    "sync_relevance_check_seconds",
+    "Time to check a repository for new commits.",
+    ["method"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+fetch_seconds = Histogram(
+    "git_fetch_seconds",
+    "Duration of git network operations.",
+    ["operation"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+db_write_seconds = Histogram(
+    "db_write_seconds",
+    "Duration of buffered database writes.",
+    ["operation"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+syncs_total = Counter("syncs_total", "Finished synchronizations by result.", ["status"], registry=registry)
+sync_failures_total = Counter("sync_failures_total", "Failed git pull attempts.", registry=registry)
+fetched_bytes_total = Counter("git_fetched_bytes_total", "Bytes received by git fetch and pull.", registry=registry)
+fetched_objects_total = Counter(
+    "git_fetched_objects_total", "Objects received by git fetch and pull.", registry=registry
+)
+fetched_refs_total = Counter("git_fetched_refs_total", "References updated by git pull.", registry=registry)
+active_syncs = Gauge("sync_active", "Synchronizations currently running.", registry=registry)
+scheduled_repositories = Gauge(
+    "sync_scheduled_repositories", "Repositories known to the scheduler.", registry=registry
+)
+queue_depth = Gauge("sync_queue_depth", "Due repositories waiting for a worker.", registry=registry)
+scheduling_lag = Gauge("sync_scheduling_lag_seconds", "Delay of the last picked up repository.", registry=registry)
+pending_writes = Gauge("sync_pending_status_writes", "Repositories with buffered status changes.", registry=registry)
+http_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests by route.",
+    ["method", "route", "status"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
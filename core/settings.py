@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import URL
@@ -14,12 +15,70 @@ class Setting(BaseSettings):
     ENV: str = "development"
     REPOSITORIES_STORAGE: str
 
+    SYNC_WORKERS: int = 8
+    SYNC_ADAPTIVE: bool = False
+    SYNC_INTERVAL_MIN: float = 5.0
+    SYNC_INTERVAL_MAX: float = 3600.0
+    SYNC_BACKOFF_FACTOR: float = 2.0
+    SYNC_STATUS_FLUSH_INTERVAL: float = 2.0
+    # In distributed mode every instance must have the working clones under REPOSITORIES_STORAGE (e.g. a shared volume).
+    SYNC_DISTRIBUTED: bool = False
+    SYNC_INSTANCE_ID: Optional[str] = None
+    SYNC_LEASE_DURATION: float = 60.0
+    SYNC_CLAIM_INTERVAL: float = 1.0
+    SYNC_RUNS_RECORD_SKIPPED: bool = False
+    SYNC_RUNS_RETENTION_DAYS: int = 90
+    SYNC_RUNS_PARTITIONS_AHEAD: int = 2
+    SYNC_RUNS_MAINTENANCE_INTERVAL: float = 3600.0
+    SYNC_RETRY_FACTOR: float = 2.0
+    SYNC_RETRY_MAX_DELAY: float = 300.0
+    CIRCUIT_BREAKER_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0
+    CIRCUIT_BREAKER_MAX_RESET_TIMEOUT: float = 600.0
+    GIT_RELEVANCE_PROBE: bool = True
+    GIT_JOB_WORKERS: int = 4
+    GIT_JOB_QUEUE_SIZE: int = 100
+    GIT_JOB_RETENTION: float = 3600.0
+    PROGRESS_STREAM_INTERVAL: float = 0.5
+    COMMIT_INDEX_LIMIT: int = 1000
+    GIT_SHARED_OBJECTS: bool = False
+    GIT_SHARED_OBJECTS_STORAGE: Optional[str] = None
+
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2: bool = False
+    HTTP_CACHE: bool = True
+    HTTP_CACHE_TTL: float = 5.0
+    HTTP_CACHE_MAXSIZE: int = 1024
+    HTTP_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    PROVIDER_INFO_TTL: float = 3600.0
+
+    TRACING_EXPORTER: Optional[str] = None
+    TRACING_FILE: str = "traces.jsonl"
+
+    BITBUCKET_WEBHOOK_SECRET: Optional[str] = None
+    BITBUCKET_WEBHOOK_ALLOW_UNSIGNED: bool = False
+    WEBHOOK_DEBOUNCE: float = 0.5
+    WEBHOOK_FALLBACK_INTERVAL: float = 600.0
+
+    BITBUCKET_BATCH_PROBE: bool = False
+    BITBUCKET_PROBE_TOKEN: Optional[str] = None
+    BITBUCKET_PROBE_CONCURRENCY: int = 16
+
     DATABASE_DRIVERNAME: str = "postgresql+psycopg2"
+    DATABASE_ASYNC_DRIVERNAME: str = "postgresql+asyncpg"
     DATABASE_USERNAME: str
     DATABASE_PASSWORD: str
     DATABASE_HOST: str
     DATABASE_PORT: str
     DATABASE_DATABASE: str
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
 
     @property
     def database_url(self) -> URL:
@@ -32,5 +91,9 @@ class Setting(BaseSettings):
             database=setting.DATABASE_DATABASE,
         )
 
+    @property
+    def async_database_url(self) -> URL:
+        return self.database_url.set(drivername=setting.DATABASE_ASYNC_DRIVERNAME)
+
 
 setting = Setting()
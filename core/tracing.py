@@ -0,0 +1,170 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar, Union
+
+from core.settings import setting
+
+T = TypeVar("T")
+
+
+class Span:
+    """
+    A timed phase of an operation. Spans opened inside another one share its trace and point to it as the parent.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "started_at", "duration", "error", "_start")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.started_at = datetime.now(timezone.utc)
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class NoopSpan:
+    """
+    Handed out while tracing is off, so the instrumented code never has to check.
+    """
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class SpanExporter(ABC):
+    """
+    Receives every finished span. Exporters are called from the event loop and from the worker threads.
+    """
+
+    enabled = True
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NoopExporter(SpanExporter):
+    enabled = False
+
+    def export(self, span: Span) -> None:
+        pass
+
+
+class FileExporter(SpanExporter):
+    """
+    Appends the finished spans to a file, one JSON object per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter or NoopExporter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter.enabled
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Union[Span, NoopSpan]]:
+        """
+        Measures the enclosed block. Without an exporter nothing is allocated or timed.
+        """
+        if not self.exporter.enabled:
+            yield NOOP_SPAN
+            return
+
+        span = Span(name, _current.get(), attributes)
+        token = _current.set(span)
+
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            _current.reset(token)
+
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                print(f"Failed to export the span '{name}': {e}")
+
+    @staticmethod
+    def propagate(function: Callable[..., T]) -> Callable[..., T]:
+        """
+        Binds the function to the current context, so spans opened in an executor thread keep their parent.
+        """
+        return functools.partial(contextvars.copy_context().run, function)
+
+    def close(self) -> None:
+        self.exporter.close()
+
+
+def create_exporter(name: Optional[str]) -> SpanExporter:
+    if not name or name == "none":
+        return NoopExporter()
+
+    if name == "file":
+        return FileExporter(setting.TRACING_FILE)
+
+    raise ValueError(f"Unknown tracing exporter '{name}', expected 'none' or 'file'.")
+
+
+tracer = Tracer(create_exporter(setting.TRACING_EXPORTER))
+span = tracer.span